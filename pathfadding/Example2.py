@@ -1,5 +1,8 @@
 import pygame
 from pygame.locals import *
+from src.AstarGrade import AStarGrade
+from src.Cache import CacheDeCaminhos
+from src.Conectividade import Conectividade
 
 class JogoCampoFutebol:
     def __init__(self):
@@ -30,6 +33,19 @@ class JogoCampoFutebol:
         self.posicao_objetivo = [0, 0]
         self.jogadores = [(10, 10), (15, 10), (5, 5)]  # Exemplo de posição de outros jogadores
 
+        # Motor de busca e cache de caminhos, criados uma vez e atualizados quando os obstáculos mudam
+        self.obstaculos_do_mapa = None
+        self.motor = None
+        self.cache_de_caminhos = None
+
+        # Busca em andamento, distribuída entre os quadros, e o caminho que o jogador está seguindo
+        self.orcamento_busca_us = 2000
+        self.busca = None
+        self.caminho = []
+        self.percorrido = []
+        self.quadros_por_passo = 12
+        self.quadros_desde_passo = 0
+
     def desenhar_campo(self):
         self.tela.fill(self.WHITE)  # Preencher a tela com a cor branca
         self.tela.blit(self.campo_imagem, (0, 0))  # Desenhar a imagem do campo de futebol na tela
@@ -37,34 +53,84 @@ class JogoCampoFutebol:
             self.tela.blit(self.jogador_imagem, (jogador[0] * self.escala, jogador[1] * self.escala))  # Desenhar outros jogadores
         self.tela.blit(self.jogador_imagem, self.posicao_jogador)  # Desenhar o jogador na tela
 
-    def astar(self, inicio, objetivo, obstaculos):
-        borda = [(inicio, 0)]
-        pais = {}
-        custo_g = {inicio: 0}
-
-        while borda:
-            atual, custo_atual = borda.pop(0)
-
-            if atual == objetivo:
-                caminho = [atual]
-                while atual != inicio:
-                    atual = pais[atual]
-                    caminho.append(atual)
-                return caminho[::-1]
+    def atualizar_mapa(self, obstaculos):
+        obstaculos = frozenset(obstaculos)
+        if self.motor is None:
+            self.motor = AStarGrade.de_obstaculos(
+                self.largura_campo // self.escala, self.altura_campo // self.escala, obstaculos,
+                custo_diagonal=1.414, cortar_cantos=True,
+            )
+            # mesma ordem de movimentos da busca original
+            self.motor.movimentos = [(dx, dy, 1 if dx == 0 or dy == 0 else 1.414) for dx, dy in
+                                     [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1)]]
+            # objetivos cercados ou ocupados são recusados sem busca
+            self.motor.conectividade = Conectividade(self.motor)
+            self.cache_de_caminhos = CacheDeCaminhos(self.motor)
+        elif obstaculos != self.obstaculos_do_mapa:
+            # só as células que mudaram: a conectividade é ajustada pelo motor, e o
+            # cache descarta apenas os caminhos afetados por elas
+            dentro = lambda c: 0 <= c[0] < self.motor.largura and 0 <= c[1] < self.motor.altura
+            bloqueadas = [c for c in obstaculos - self.obstaculos_do_mapa if dentro(c)]
+            liberadas = [c for c in self.obstaculos_do_mapa - obstaculos if dentro(c)]
+            for x, y in bloqueadas:
+                self.motor.atualizar_celula(x, y, True)
+            for x, y in liberadas:
+                self.motor.atualizar_celula(x, y, False)
+            self.cache_de_caminhos.atualizar_mapa(bloqueadas, liberadas)
+        self.obstaculos_do_mapa = obstaculos
+        return self.motor
 
-            for vizinho in [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1)]:
-                proximo = (atual[0] + vizinho[0], atual[1] + vizinho[1])
-                novo_custo_g = custo_g[atual] + (1 if vizinho[0] == 0 or vizinho[1] == 0 else 1.414)
-
-                if proximo in obstaculos or proximo[0] < 0 or proximo[1] < 0 or proximo[0] >= self.largura_campo // self.escala or proximo[1] >= self.altura_campo // self.escala:
-                    continue
-
-                if proximo not in custo_g or novo_custo_g < custo_g[proximo]:
-                    custo_g[proximo] = novo_custo_g
-                    borda.append((proximo, novo_custo_g))
-                    pais[proximo] = atual
-
-        return None
+    def astar(self, inicio, objetivo, obstaculos):
+        self.atualizar_mapa(obstaculos)
+        return self.cache_de_caminhos.astar(inicio, objetivo)
+
+    def iniciar_busca(self, inicio, objetivo):
+        obstaculos = [(jogador[0], jogador[1]) for jogador in self.jogadores]
+        motor = self.atualizar_mapa(obstaculos)
+        self.caminho = [inicio]
+        self.percorrido = [inicio]
+        # um clique em uma célula inalcançável leva à célula alcançável mais próxima dela
+        objetivo = motor.conectividade.objetivo_mais_proximo(inicio, objetivo)
+        if objetivo is None:
+            self.busca = None
+            return
+        # um caminho já conhecido (ou trecho de um) é seguido sem nova busca
+        caminho = self.cache_de_caminhos.consultar(inicio, objetivo)
+        if caminho is not None:
+            self.caminho = caminho
+            self.busca = None
+            return
+        self.busca = motor.busca_incremental(inicio, objetivo)
+
+    def avancar_busca(self):
+        """avança a busca dentro do orçamento do quadro; o jogador segue o caminho parcial enquanto isso"""
+        caminho = self.busca.avancar(max_microssegundos=self.orcamento_busca_us)
+        if not self.busca.concluida:
+            self.caminho = caminho
+            return
+        if caminho is None:
+            self.caminho = self.percorrido[-1:]
+            self.busca = None
+            return
+        self.cache_de_caminhos.guardar(caminho[0], caminho[-1], caminho)
+        if caminho[:len(self.percorrido)] != self.percorrido:
+            # o caminho final não passa por onde o jogador já andou: replaneja a partir da posição atual
+            self.iniciar_busca(self.percorrido[-1], caminho[-1])
+            return
+        self.caminho = caminho
+        self.busca = None
+
+    def mover_jogador(self):
+        self.quadros_desde_passo += 1
+        if self.quadros_desde_passo < self.quadros_por_passo:
+            return
+        self.quadros_desde_passo = 0
+        n = len(self.percorrido)
+        if len(self.caminho) > n and self.caminho[:n] == self.percorrido:
+            ponto = self.caminho[n]
+            self.percorrido.append(ponto)
+            self.posicao_jogador[0] = ponto[0] * self.escala
+            self.posicao_jogador[1] = ponto[1] * self.escala
 
     def executar(self):
         clock = pygame.time.Clock()
@@ -80,17 +146,12 @@ class JogoCampoFutebol:
                     self.posicao_objetivo[1] -= self.jogador_imagem.get_height() // 2
                     self.posicao_objetivo[0] = max(0, min(self.posicao_objetivo[0], self.largura_tela - self.jogador_imagem.get_width()))
                     self.posicao_objetivo[1] = max(0, min(self.posicao_objetivo[1], self.altura_tela - self.jogador_imagem.get_height()))
-                    obstaculos = [(jogador[0], jogador[1]) for jogador in self.jogadores]
-                    caminho = self.astar((self.posicao_jogador[0] // self.escala, self.posicao_jogador[1] // self.escala), 
-                                         (self.posicao_objetivo[0] // self.escala, self.posicao_objetivo[1] // self.escala), 
-                                         obstaculos)
-                    if caminho:
-                        for ponto in caminho:
-                            self.posicao_jogador[0] = ponto[0] * self.escala
-                            self.posicao_jogador[1] = ponto[1] * self.escala
-                            self.desenhar_campo()
-                            pygame.display.update()
-                            clock.tick(5)
+                    self.iniciar_busca((self.posicao_jogador[0] // self.escala, self.posicao_jogador[1] // self.escala),
+                                       (self.posicao_objetivo[0] // self.escala, self.posicao_objetivo[1] // self.escala))
+
+            if self.busca is not None:
+                self.avancar_busca()
+            self.mover_jogador()
 
             self.desenhar_campo()  # Chamar a função para desenhar o campo de futebol
             pygame.display.update()  # Atualizar a tela
@@ -1,39 +1,47 @@
 import matplotlib.pyplot as plt 
+from src.AstarGrade import AStarGrade
+from src.Conectividade import Conectividade
 
 class AStar:
     def __init__(self, largura_campo, altura_campo, direcoes):
         self.largura_campo = largura_campo
         self.altura_campo = altura_campo
         self.direcoes = direcoes
+        # motor de busca da grade, criado na primeira busca e atualizado célula a célula
+        self.obstaculos_do_mapa = None
+        self.motor = None
+
+    def criar_motor(self, obstaculos):
+        motor = AStarGrade.de_obstaculos(
+            self.largura_campo, self.altura_campo, obstaculos,
+            diagonais=any(dx and dy for dx, dy in self.direcoes), custo_diagonal=1.414, cortar_cantos=True,
+        )
+        # mesmos movimentos e custos (1 reto, 1.414 diagonal), na ordem de `direcoes`
+        motor.movimentos = [(dx, dy, 1 if dx == 0 or dy == 0 else 1.414) for dx, dy in self.direcoes]
+        return motor
+
+    def atualizar_obstaculos(self, obstaculos):
+        # só as células que mudaram; o índice de conectividade, se existir, é ajustado junto
+        mudancas = [(c, False) for c in self.obstaculos_do_mapa - obstaculos]
+        mudancas += [(c, True) for c in obstaculos - self.obstaculos_do_mapa]
+        for (x, y), bloqueado in mudancas:
+            if 0 <= x < self.largura_campo and 0 <= y < self.altura_campo:
+                self.motor.atualizar_celula(x, y, bloqueado)
 
     def calcular_caminho(self, inicio, objetivo, obstaculos):
-        nodes = [(inicio, 0)]
-        nodeInicial = {}
-        custo_g = {inicio: 0}
-
-        while nodes:
-            atual, custo_atual = nodes.pop(0)
-
-            if atual == objetivo:
-                caminho = [atual]
-                while atual != inicio:
-                    atual = nodeInicial[atual]
-                    caminho.append(atual)
-                return caminho[::-1]
-
-            for direcao in self.direcoes:
-                proximo = (atual[0] + direcao[0], atual[1] + direcao[1])
-                novo_custo_g = custo_g[atual] + (1 if direcao[0] == 0 or direcao[1] == 0 else 1.414)
-
-                if proximo in obstaculos or proximo[0] < 0 or proximo[1] < 0 or proximo[0] >= self.largura_campo or proximo[1] >= self.altura_campo:
-                    continue
-
-                if proximo not in custo_g or novo_custo_g < custo_g[proximo]:
-                    custo_g[proximo] = novo_custo_g
-                    nodes.append((proximo, novo_custo_g))
-                    nodeInicial[proximo] = atual
-
-        return None
+        obstaculos = frozenset(obstaculos)
+        if self.motor is None:
+            self.motor = self.criar_motor(obstaculos)
+        elif obstaculos != self.obstaculos_do_mapa:
+            self.atualizar_obstaculos(obstaculos)
+        self.obstaculos_do_mapa = obstaculos
+
+        caminho = self.motor.astar(inicio, objetivo)
+        if caminho is None and self.motor.conectividade is None:
+            # o índice só é construído depois do primeiro objetivo inalcançável, e a
+            # partir daí os objetivos cercados são recusados sem busca
+            self.motor.conectividade = Conectividade(self.motor)
+        return None if caminho is None else list(caminho)
 
 
 largura_campo = 200
@@ -0,0 +1,228 @@
+""" Benchmark reprodutível do motor de busca A*.
+
+Cenários (todos gerados a partir de uma semente):
+    labirinto      labirintos de `main.criar_labirinto` (4-conectados)
+    campo_futebol  campo no estilo de `Exemplo1.py`, com bordas, barreira central e blocos
+    campo_aberto   campo no estilo de `PlotStar.py`, com poucos obstáculos espalhados
+    inalcancavel   campo aberto com o objetivo cercado por paredes
+
+Por padrão os tamanhos vão de 50 a 2000 células por lado. O motor genérico
+(`astar`, um NoDeBusca por célula alcançada) só é medido até `--limite-astar`
+células; acima disso a linha aparece como pulada. Contadores que um motor não
+mede aparecem como "n/d".
+
+Uso:
+    python benchmark.py --tamanhos 50 100 200 --json resultado.json
+    python benchmark.py --tamanhos 2000 --limite-astar 0
+    python benchmark.py --comparar resultado_anterior.json
+    python benchmark.py --peso 1.5
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from main import criar_labirinto
+from src.Astar import AStar, EstatisticasDeBusca
+from src.AstarGrade import AStarGrade, AStarJPS
+
+MOTORES = ("astar", "grade", "jps")
+# células acima das quais o motor genérico não é medido por padrão
+LIMITE_ASTAR = 500 * 500
+
+
+################################################################################
+# cenários
+
+def cenario_labirinto(tamanho, semente):
+    # cada célula do labirinto ocupa 3x2 caracteres
+    labirinto = criar_labirinto(max(2, tamanho // 3), max(2, tamanho // 2), semente=semente)
+    linhas = labirinto.split('\n')
+    grade = [[c != ' ' for c in linha] for linha in linhas]
+    return grade, (1, 1), (len(linhas[0]) - 2, len(linhas) - 2), False
+
+
+def cenario_campo_futebol(tamanho, semente):
+    gerador = random.Random(semente)
+    grade = [[x in (0, tamanho - 1) or y in (0, tamanho - 1) for x in range(tamanho)] for y in range(tamanho)]
+    # barreira horizontal com passagens apenas nas pontas, como a linha 8 do campo_futebol
+    barreira = (tamanho * 2) // 5
+    for x in range(2, tamanho - 2):
+        grade[barreira][x] = True
+    for _ in range(tamanho // 4):
+        x, y = gerador.randrange(2, tamanho - 4), gerador.randrange(2, tamanho - 3)
+        for dx in range(gerador.randint(1, 3)):
+            grade[y][x + dx] = True
+    inicio, objetivo = (1, 1), (tamanho - 2, tamanho - 2)
+    for x, y in (inicio, objetivo):
+        grade[y][x] = False
+    return grade, inicio, objetivo, True
+
+
+def cenario_campo_aberto(tamanho, semente):
+    gerador = random.Random(semente)
+    grade = [[gerador.random() < 0.02 for _ in range(tamanho)] for _ in range(tamanho)]
+    inicio, objetivo = (0, 0), (tamanho - 1, tamanho - 1)
+    for x, y in (inicio, objetivo):
+        grade[y][x] = False
+    return grade, inicio, objetivo, True
+
+
+def cenario_inalcancavel(tamanho, semente):
+    grade, inicio, _, diagonais = cenario_campo_aberto(tamanho, semente)
+    # objetivo no centro de um anel de paredes
+    x, y = tamanho - 2, tamanho - 2
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            grade[y + dy][x + dx] = (dx, dy) != (0, 0)
+    return grade, inicio, (x, y), diagonais
+
+
+CENARIOS = {
+    "labirinto": cenario_labirinto,
+    "campo_futebol": cenario_campo_futebol,
+    "campo_aberto": cenario_campo_aberto,
+    "inalcancavel": cenario_inalcancavel,
+}
+
+
+################################################################################
+# medição
+
+def criar_motor(nome, grade, diagonais):
+    # sem corte de cantos, o grafo das medições anteriores, igual para as três variantes
+    if nome == "jps":
+        return AStarJPS(grade, diagonais=diagonais, cortar_cantos=False, jps_mais=True)
+    return AStarGrade(grade, diagonais=diagonais, cortar_cantos=False)
+
+
+def buscar(nome, motor, inicio, objetivo, estatisticas=None, peso=1.0):
+    if nome == "astar":
+        return AStar.astar(motor, inicio, objetivo, estatisticas=estatisticas, peso=peso)
+    return motor.astar(inicio, objetivo, estatisticas=estatisticas, peso=peso)
+
+
+def medir(cenario, tamanho, nome, semente, repeticoes, peso=1.0):
+    grade, inicio, objetivo, diagonais = CENARIOS[cenario](tamanho, semente)
+    motor = criar_motor(nome, grade, diagonais)
+    if nome == "jps":
+        # o pré-processamento do JPS+ é feito uma vez por mapa, fora da medição
+        motor.preprocessar()
+
+    tempos = []
+    caminho = None
+    for _ in range(repeticoes):
+        inicio_medicao = time.perf_counter()
+        caminho = buscar(nome, motor, inicio, objetivo, peso=peso)
+        tempos.append(time.perf_counter() - inicio_medicao)
+    caminho = None if caminho is None else list(caminho)
+
+    tracemalloc.start()
+    buscar(nome, motor, inicio, objetivo, peso=peso)
+    _, pico_memoria = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # contadores de uma execução separada, para não afetar os tempos
+    estatisticas = EstatisticasDeBusca()
+    buscar(nome, motor, inicio, objetivo, estatisticas, peso)
+    custo = None
+    if caminho is not None:
+        custo = sum(motor.distancia_entre(a, b) for a, b in zip(caminho, caminho[1:]))
+
+    return {
+        "cenario": cenario,
+        "tamanho": tamanho,
+        "motor": nome,
+        "peso": peso,
+        "tempo_mediano_s": statistics.median(tempos),
+        "tempo_minimo_s": min(tempos),
+        "nos_expandidos": estatisticas.expandidos,
+        "nos_gerados": estatisticas.gerados,
+        "pico_lista_aberta": estatisticas.pico_lista_aberta,
+        "pico_memoria_bytes": pico_memoria,
+        "custo": custo,
+        "tamanho_caminho": None if caminho is None else len(caminho),
+    }
+
+
+def versao_do_codigo():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def formatar(valor):
+    """contadores que o motor não mede (None) aparecem explicitamente como n/d"""
+    return "n/d" if valor is None else valor
+
+
+def comparar(anterior, atual):
+    """
+    imprime a variação do tempo mediano em relação a uma execução anterior;
+    só são comparados resultados com o mesmo peso (execuções antigas, sem o
+    campo, usaram peso 1)
+    """
+    chave = lambda r: (r["cenario"], r["tamanho"], r["motor"], r.get("peso", 1.0))
+    antes = {chave(r): r for r in anterior["resultados"]}
+    for r in atual["resultados"]:
+        a = antes.get(chave(r))
+        if a is None:
+            continue
+        variacao = r["tempo_mediano_s"] / a["tempo_mediano_s"] if a["tempo_mediano_s"] else float("inf")
+        print("%-14s %6d %-6s peso=%-4g %10.4fs -> %10.4fs  (x%.2f)" % (chave(r) + (a["tempo_mediano_s"], r["tempo_mediano_s"], variacao)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[50, 100, 200, 2000])
+    parser.add_argument("--cenarios", nargs="+", choices=sorted(CENARIOS), default=list(CENARIOS))
+    parser.add_argument("--motores", nargs="+", choices=MOTORES, default=list(MOTORES))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--peso", type=float, default=1.0, help="peso ε do A* ponderado")
+    parser.add_argument("--limite-astar", type=int, default=LIMITE_ASTAR,
+                        help="células acima das quais o motor astar é pulado (0 = sem limite)")
+    parser.add_argument("--json", help="arquivo onde gravar os resultados")
+    parser.add_argument("--comparar", help="resultado JSON anterior para comparação")
+    args = parser.parse_args()
+
+    resultados = []
+    for cenario in args.cenarios:
+        for tamanho in args.tamanhos:
+            for nome in args.motores:
+                if nome == "astar" and args.limite_astar and tamanho * tamanho > args.limite_astar:
+                    print("%-14s %6d %-6s pulado: mais de %d células (--limite-astar)" % (
+                        cenario, tamanho, nome, args.limite_astar))
+                    continue
+                r = medir(cenario, tamanho, nome, args.semente, args.repeticoes, args.peso)
+                resultados.append(r)
+                print("%-14s %6d %-6s %10.4fs  expandidos=%-8s pico_aberta=%-8s memoria=%dKiB custo=%s" % (
+                    cenario, tamanho, nome, r["tempo_mediano_s"], formatar(r["nos_expandidos"]),
+                    formatar(r["pico_lista_aberta"]), r["pico_memoria_bytes"] // 1024,
+                    "inalcançável" if r["custo"] is None else r["custo"]))
+
+    saida = {
+        "commit": versao_do_codigo(),
+        "data": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "semente": args.semente,
+        "resultados": resultados,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(saida, f, indent=2)
+    if args.comparar:
+        with open(args.comparar) as f:
+            comparar(json.load(f), saida)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,56 +1,103 @@
-from src.Astar import AStar
+from src.Astar import AStar, ArenaDeBusca, BuscaMaisRecente, DStarLite, EstatisticasDeBusca, ListaAberta, ListaAbertaHeapIndexado, ListaAbertaHeapPreguicoso
+from src.AstarGrade import AStarGrade, AStarJPS
+from src.Cache import CacheDeCaminhos
+from src.CampoDeFluxo import CampoDeFluxo
+from src.Conectividade import Conectividade
+from src.Cooperativo import PlanejadorCooperativo
+from src.Hierarquico import AStarHierarquico
+from src.Mapa import Mapa
+from src.Marcos import HeuristicaDeMarcos, Marcos
+import asyncio
+import io
+import os
+import pickle
 import sys
 import math
+import random
+import tempfile
 import unittest
 
-def criar_labirinto(largura=30, altura=30):
-    """retorna um labirinto ASCII como uma string"""
-    from random import shuffle, randrange
-    vis = [[0] * largura + [1] for _ in range(altura)] + [[1] * (largura + 1)]
-    ver = [["|  "] * largura + ['|'] for _ in range(altura)] + [[]]
-    hor = [["+--"] * largura + ['+'] for _ in range(altura + 1)]
+def criar_labirinto(largura=30, altura=30, semente=None):
+    """retorna um labirinto ASCII como uma string.
+        com uma `semente`, o mesmo labirinto é gerado a cada chamada.
+    """
+    gerador = random.Random(semente) if semente is not None else random
+    # visitados em um buffer plano com uma coluna e uma linha extras já visitadas:
+    # os índices -1 (fora da grade) caem nelas, como na versão com listas
+    lv = largura + 1
+    vis = bytearray(lv * (altura + 1))
+    vis[largura::lv] = b'\x01' * (altura + 1)
+    vis[altura * lv:] = b'\x01' * lv
 
-    def andar(x, y):
-        vis[y][x] = 1
+    # a saída é escrita direto em um bytearray: linhas pares com as paredes
+    # horizontais ("+--"), ímpares com as verticais ("|  "), todas com '\n'
+    w = 3 * largura + 2
+    linha_hor = b'+--' * largura + b'+\n'
+    linha_ver = b'|  ' * largura + b'|\n'
+    saida = bytearray((linha_hor + linha_ver) * altura + linha_hor)
+    shuffle = gerador.shuffle
 
+    def visitar(x, y):
+        vis[y * lv + x] = 1
         d = [(x - 1, y), (x, y + 1), (x + 1, y), (x, y - 1)]
         shuffle(d)
+        return (x, y, iter(d))
+
+    # busca em profundidade com pilha explícita, na mesma ordem da versão recursiva,
+    # para que labirintos grandes não estourem o limite de recursão
+    pilha = [visitar(gerador.randrange(largura), gerador.randrange(altura))]
+    while pilha:
+        x, y, d = pilha[-1]
         for (xx, yy) in d:
-            if vis[yy][xx]:
+            if vis[yy * lv + xx]:
                 continue
             if xx == x:
-                hor[max(y, yy)][x] = "+  "
-            if yy == y:
-                ver[y][max(x, xx)] = "   "
-            andar(xx, yy)
+                # abre a parede horizontal entre as duas células
+                inicio = 2 * (y if y > yy else yy) * w + 3 * x + 1
+                saida[inicio] = saida[inicio + 1] = 32  # ' '
+            else:
+                # abre a parede vertical
+                saida[(2 * y + 1) * w + 3 * (x if x > xx else xx)] = 32
+            pilha.append(visitar(xx, yy))
+            break
+        else:
+            pilha.pop()
+    return saida[:-1].decode('ascii')
 
-    andar(randrange(largura), randrange(altura))
-    resultado = ''
-    for (a, b) in zip(hor, ver):
-        resultado = resultado + (''.join(a + ['\n'] + b)) + '\n'
-    return resultado.strip()
+
+def _linhas_desenhadas(labirinto, conjunto1=(), conjunto2=(), c='#', c2='*'):
+    """gera as linhas (com '\n') de `desenhar_labirinto`, uma de cada vez"""
+    linhas = labirinto.strip().split('\n') if isinstance(labirinto, str) else labirinto
+    largura = len(linhas[0])
+    altura = len(linhas)
+    # as posições são agrupadas por linha uma única vez; conjunto1 tem prioridade
+    marcas = {}
+    for conjunto, caractere in ((conjunto2, c2), (conjunto1, c)):
+        for (i, j) in conjunto:
+            if 0 <= i < largura and 0 <= j < altura:
+                marcas.setdefault(j, {})[i] = caractere
+    for j in range(altura):
+        linha = linhas[j][:largura]
+        if j in marcas:
+            caracteres = list(linha)
+            for i, caractere in marcas[j].items():
+                caracteres[i] = caractere
+            linha = ''.join(caracteres)
+        yield linha + '\n'
 
 
 def desenhar_labirinto(labirinto, conjunto1=[], conjunto2=[], c='#', c2='*'):
     """retorna um labirinto ASCII, desenhando eventualmente um (ou 2) conjuntos de posições.
         útil para desenhar a solução encontrada pelo algoritmo A*.
     """
-    conjunto1 = list(conjunto1)
-    conjunto2 = list(conjunto2)
-    linhas = labirinto.strip().split('\n')
-    largura = len(linhas[0])
-    altura = len(linhas)
-    resultado = ''
-    for j in range(altura):
-        for i in range(largura):
-            if (i, j) in conjunto1:
-                resultado = resultado + c
-            elif (i, j) in conjunto2:
-                resultado = resultado + c2
-            else:
-                resultado = resultado + linhas[j][i]
-        resultado = resultado + '\n'
-    return resultado
+    return ''.join(_linhas_desenhadas(labirinto, conjunto1, conjunto2, c, c2))
+
+
+def escrever_labirinto(arquivo, labirinto, conjunto1=[], conjunto2=[], c='#', c2='*'):
+    """grava em `arquivo` (um arquivo de texto aberto) o mesmo texto de `desenhar_labirinto`,
+        linha a linha, sem montar a string inteira na memória.
+    """
+    arquivo.writelines(_linhas_desenhadas(labirinto, conjunto1, conjunto2, c, c2))
 
 
 class SolucionadorLabirinto(AStar):
@@ -80,10 +127,10 @@ class SolucionadorLabirinto(AStar):
         x, y = nó
         return[(nx, ny) for nx, ny in[(x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)]if 0 <= nx < self.largura and 0 <= ny < self.altura and self.linhas[ny][nx] == ' ']
 
-def resolver_labirinto():
+def resolver_labirinto(semente=None):
     # gerar um labirinto ASCII
     tamanho = 20
-    labirinto = criar_labirinto(tamanho, tamanho)
+    labirinto = criar_labirinto(tamanho, tamanho, semente=semente)
 
     largura = len(labirinto.split('\n')[0])
     altura = len(labirinto.split('\n'))
@@ -96,8 +143,471 @@ def resolver_labirinto():
     return desenhar_labirinto(labirinto, list(caminhoEncontrado))
 
 class TestesLabirinto(unittest.TestCase):
+    def _labirinto(self, semente, tamanho=15):
+        """labirinto com semente fixa e o início e o objetivo em cantos opostos"""
+        labirinto = criar_labirinto(tamanho, tamanho, semente=semente)
+        linhas = labirinto.split('\n')
+        return labirinto, (1, 1), (len(linhas[0]) - 2, len(linhas) - 2)
+
+    def _custo(self, solucionador, caminho):
+        return sum(solucionador.distancia_entre(a, b) for a, b in zip(caminho, caminho[1:]))
+
     def test_resolver_labirinto(self):
-        resolver_labirinto()
+        resolver_labirinto(semente=0)
+
+    def test_criar_labirinto_com_semente(self):
+        self.assertEqual(criar_labirinto(40, 40, semente=7), criar_labirinto(40, 40, semente=7))
+        # maior que o limite de recursão da versão recursiva
+        self.assertEqual(len(criar_labirinto(60, 60, semente=1).split('\n')), 121)
+
+    def test_astar_grade_mesmo_custo(self):
+        labirinto, inicio, objetivo = self._labirinto(1)
+        esperado = list(SolucionadorLabirinto(labirinto).astar(inicio, objetivo))
+        caminho = list(AStarGrade.de_linhas(labirinto, diagonais=False).astar(inicio, objetivo))
+        self.assertEqual(len(caminho), len(esperado))
+        self.assertEqual((caminho[0], caminho[-1]), (inicio, objetivo))
+
+    def test_tipos_de_lista_aberta(self):
+        labirinto, inicio, objetivo = self._labirinto(2)
+        solucionador = SolucionadorLabirinto(labirinto)
+        tamanhos = {len(list(solucionador.astar(inicio, objetivo, tipo_lista_aberta=tipo)))
+                    for tipo in (ListaAberta, ListaAbertaHeapIndexado, ListaAbertaHeapPreguicoso)}
+        self.assertEqual(len(tamanhos), 1)
+
+    def test_jps_mesmo_custo(self):
+        labirinto, inicio, objetivo = self._labirinto(3)
+        grade = AStarGrade.de_linhas(labirinto, cortar_cantos=False)
+        esperado = list(grade.astar(inicio, objetivo))
+        for jps_mais in (False, True):
+            caminho = list(AStarJPS.de_linhas(labirinto, cortar_cantos=False, jps_mais=jps_mais).astar(inicio, objetivo))
+            self.assertEqual(len(caminho), len(esperado))
+            for a, b in zip(caminho, caminho[1:]):
+                self.assertIn(b, grade.vizinhos(a))
+
+    def test_jps_cortando_cantos(self):
+        aleatorio = random.Random(13)
+        for i in range(20):
+            grade = [[aleatorio.random() < 0.3 for _ in range(12)] for _ in range(12)]
+            # metade das buscas parte de uma célula bloqueada, que também tem saída
+            grade[0][0] = i % 2 == 0
+            grade[11][11] = False
+            # os dois motores cortam cantos por padrão
+            normal = AStarGrade(grade, custo_diagonal=1.414)
+            esperado = normal.astar((0, 0), (11, 11))
+            for jps_mais in (False, True):
+                jps = AStarJPS(grade, custo_diagonal=1.414, jps_mais=jps_mais)
+                caminho = jps.astar((0, 0), (11, 11))
+                if esperado is None:
+                    self.assertIsNone(caminho)
+                    continue
+                caminho = list(caminho)
+                self.assertAlmostEqual(self._custo(normal, caminho), self._custo(normal, list(esperado)))
+                for a, b in zip(caminho, caminho[1:]):
+                    self.assertIn(b, normal.vizinhos(a))
+
+    def test_astar_bidirecional(self):
+        labirinto, inicio, objetivo = self._labirinto(4)
+        solucionador = SolucionadorLabirinto(labirinto)
+        esperado = list(solucionador.astar(inicio, objetivo))
+        caminho = solucionador.astar(inicio, objetivo, bidirecional=True)
+        self.assertEqual(len(caminho), len(esperado))
+        self.assertEqual((caminho[0], caminho[-1]), (inicio, objetivo))
+        invertido = solucionador.astar(inicio, objetivo, caminho_invertido=True, bidirecional=True)
+        self.assertEqual(invertido, caminho[::-1])
+        # os motores de grade aceitam as mesmas opções do AStar.astar
+        for grade in (AStarGrade.de_linhas(labirinto, diagonais=False), AStarJPS.de_linhas(labirinto, diagonais=False)):
+            self.assertEqual(len(grade.astar(inicio, objetivo, bidirecional=True)), len(esperado))
+            self.assertEqual(len(grade.astar(inicio, objetivo, arena=ArenaDeBusca())), len(esperado))
+        with self.assertRaises(ValueError):
+            AStarHierarquico(AStarGrade.de_linhas(labirinto)).astar(inicio, objetivo, bidirecional=True)
+
+    def test_astar_bidirecional_expande_menos(self):
+        class Contador(SolucionadorLabirinto):
+            expandidos = 0
+
+            def vizinhos(self, nó):
+                self.expandidos += 1
+                return super().vizinhos(nó)
+
+        labirinto, inicio, objetivo = self._labirinto(3, tamanho=30)
+        unidirecional, bidirecional = Contador(labirinto), Contador(labirinto)
+        esperado = list(unidirecional.astar(inicio, objetivo))
+        caminho = bidirecional.astar(inicio, objetivo, bidirecional=True)
+        self.assertEqual(len(caminho), len(esperado))
+        self.assertLess(bidirecional.expandidos, unidirecional.expandidos)
+
+    def test_estatisticas_de_busca(self):
+        labirinto, inicio, objetivo = self._labirinto(3)
+        grade = AStarGrade.de_linhas(labirinto, diagonais=False)
+
+        # a instrumentação não altera o resultado de nenhum dos dois motores
+        generica, rapida, expandidos = EstatisticasDeBusca(), EstatisticasDeBusca(), []
+        esperado = list(AStar.astar(grade, inicio, objetivo))
+        self.assertEqual(list(AStar.astar(grade, inicio, objetivo, estatisticas=generica)), esperado)
+        self.assertEqual(list(grade.astar(inicio, objetivo, ao_expandir=expandidos.append)), esperado)
+        self.assertEqual(list(grade.astar(inicio, objetivo, estatisticas=rapida)), list(grade.astar(inicio, objetivo)))
+
+        self.assertEqual(generica.expandidos, len(expandidos))
+        self.assertEqual(generica.remocoes, generica.expandidos + 1)
+        self.assertEqual(generica.insercoes, generica.gerados)
+        self.assertGreaterEqual(generica.pico_lista_aberta, 1)
+        self.assertTrue(0 < rapida.expandidos < rapida.gerados)
+        self.assertIsNone(rapida.insercoes)
+        self.assertGreaterEqual(rapida.pico_lista_aberta, 1)
+        jps = EstatisticasDeBusca()
+        AStarJPS.de_linhas(labirinto).astar(inicio, objetivo, estatisticas=jps)
+        self.assertGreaterEqual(jps.pico_lista_aberta, 1)
+
+    def test_busca_incremental(self):
+        labirinto, inicio, objetivo = self._labirinto(5)
+        solucionador = SolucionadorLabirinto(labirinto)
+        esperado = list(solucionador.astar(inicio, objetivo))
+
+        busca = solucionador.busca_incremental(inicio, objetivo)
+        partes = 0
+        while not busca.concluida:
+            caminho = busca.avancar(max_expansoes=10)
+            partes += 1
+            self.assertEqual(caminho[0], inicio)
+            for a, b in zip(caminho, caminho[1:]):
+                self.assertIn(b, list(solucionador.vizinhos(a)))
+        self.assertGreater(partes, 1)
+        self.assertEqual(caminho, esperado)
+        self.assertEqual(busca.avancar(max_microssegundos=1), esperado)
+
+        fechado = labirinto.split('\n')
+        fechado[1] = fechado[1][:2] + '|' + fechado[1][3:]
+        fechado[2] = fechado[2][:1] + '-' + fechado[2][2:]
+        busca = SolucionadorLabirinto('\n'.join(fechado)).busca_incremental(inicio, objetivo)
+        self.assertIsNone(busca.avancar())
+        self.assertTrue(busca.concluida)
+
+    def test_astar_ponderado_e_ara(self):
+        grade = [[(x * 7 + y * 13) % 11 == 0 for x in range(40)] for y in range(40)]
+        grade[0][0] = grade[39][39] = False
+        solucionador = AStarGrade(grade)
+        otimo = self._custo(solucionador, list(solucionador.astar((0, 0), (39, 39))))
+        self.assertLessEqual(self._custo(solucionador, list(solucionador.astar((0, 0), (39, 39), peso=1.5))), 1.5 * otimo + 1e-9)
+
+        solucoes = list(solucionador.ara((0, 0), (39, 39), peso_inicial=3.0, passo=0.5))
+        limites = [limite for _, _, limite in solucoes]
+        self.assertEqual(limites, sorted(limites, reverse=True))
+        for caminho, custo_caminho, limite in solucoes:
+            self.assertEqual((caminho[0], caminho[-1]), ((0, 0), (39, 39)))
+            self.assertAlmostEqual(custo_caminho, self._custo(solucionador, caminho))
+            self.assertLessEqual(custo_caminho, limite * otimo + 1e-9)
+        # cada solução é estritamente melhor que a anterior, e a última é a ótima
+        custos = [custo_caminho for _, custo_caminho, _ in solucoes]
+        self.assertEqual(custos, sorted(set(custos), reverse=True))
+        self.assertAlmostEqual(custos[-1], otimo)
+
+        # o custo gerado é o do caminho mesmo quando o gscore do objetivo ficou desatualizado
+        aleatorio = random.Random(12)
+        for _ in range(30):
+            grade = AStarGrade([[aleatorio.random() < 0.2 for _ in range(12)] for _ in range(12)], diagonais=False)
+            for caminho, custo_caminho, _ in grade.ara((0, 0), (11, 11), peso_inicial=3.0, passo=0.5):
+                self.assertAlmostEqual(custo_caminho, self._custo(grade, caminho))
+
+    def test_arena_de_busca(self):
+        labirinto, inicio, objetivo = self._labirinto(8, tamanho=12)
+        solucionador = SolucionadorLabirinto(labirinto)
+        pares = [(inicio, objetivo), ((1, objetivo[1]), (objetivo[0], 1))]
+        arena = ArenaDeBusca()
+        for inicio, objetivo in pares * 2:
+            esperado = list(solucionador.astar(inicio, objetivo))
+            self.assertEqual(solucionador.astar(inicio, objetivo, arena=arena), esperado)
+        self.assertEqual(arena.geracao, 4)
+
+        # depois do aquecimento nenhum registro novo é criado
+        registros = dict(arena.nós)
+        for inicio, objetivo in pares:
+            solucionador.astar(inicio, objetivo, arena=arena)
+        self.assertEqual(len(arena), len(registros))
+        self.assertTrue(all(arena.nós[dado] is nó for dado, nó in registros.items()))
+
+        arena.capacidade = 10
+        solucionador.astar(*pares[0], arena=arena)
+        arena.nova_busca(ListaAbertaHeapIndexado)
+        self.assertLessEqual(len(arena), 10)
+
+    def test_vizinhos_com_custos(self):
+        class EmLote(SolucionadorLabirinto):
+            chamadas = 0
+
+            def vizinhos_com_custos(self, nó, objetivo):
+                self.chamadas += 1
+                return [(v, 1, math.hypot(objetivo[0] - v[0], objetivo[1] - v[1])) for v in self.vizinhos(nó)]
+
+        class HeuristicaNula(EmLote):
+            def estimativa_de_custo_heuristico(self, n1, n2):
+                return 0
+
+        labirinto, inicio, objetivo = self._labirinto(9)
+        em_lote = EmLote(labirinto)
+        self.assertEqual(list(em_lote.astar(inicio, objetivo)), list(SolucionadorLabirinto(labirinto).astar(inicio, objetivo)))
+        self.assertGreater(em_lote.chamadas, 0)
+        # o lote foi escrito para a heurística de EmLote: a subclasse volta ao laço normal
+        sem_lote = HeuristicaNula(labirinto)
+        self.assertIsNotNone(sem_lote.astar(inicio, objetivo))
+        self.assertEqual(sem_lote.chamadas, 0)
+
+    def test_heuristica_de_marcos(self):
+        class SolucionadorComMarcos(HeuristicaDeMarcos, SolucionadorLabirinto):
+            pass
+
+        labirinto, inicio, objetivo = self._labirinto(4)
+        solucionador = SolucionadorComMarcos(labirinto)
+        solucionador.marcos = Marcos(solucionador, [inicio], quantidade=4)
+        self.assertEqual(len(solucionador.marcos.marcos), 4)
+
+        sem_marcos, com_marcos = EstatisticasDeBusca(), EstatisticasDeBusca()
+        esperado = list(AStar.astar(SolucionadorLabirinto(labirinto), inicio, objetivo, estatisticas=sem_marcos))
+        caminho = list(AStar.astar(solucionador, inicio, objetivo, estatisticas=com_marcos))
+        self.assertEqual(len(caminho), len(esperado))
+        self.assertLess(com_marcos.expandidos, sem_marcos.expandidos)
+        for nó in caminho:
+            # admissível: nunca maior que a distância real restante
+            self.assertLessEqual(solucionador.marcos(nó, objetivo), len(caminho) - 1 - caminho.index(nó))
+
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = os.path.join(pasta, 'marcos.pkl')
+            solucionador.marcos.salvar(arquivo)
+            carregado = Marcos.carregar(arquivo, solucionador)
+            self.assertEqual(carregado.tabelas, solucionador.marcos.tabelas)
+            self.assertEqual(carregado(inicio, objetivo), solucionador.marcos(inicio, objetivo))
+            with self.assertRaises(ValueError):
+                Marcos.carregar(arquivo, SolucionadorLabirinto(criar_labirinto(15, 15, semente=5)))
+
+    def test_campo_de_fluxo(self):
+        gerador = random.Random(2)
+        grade = AStarGrade([[gerador.random() < 0.25 for _ in range(20)] for _ in range(20)], cortar_cantos=False)
+        objetivo = (10, 10)
+        grade.bloqueado[10 * 20 + 10] = 0
+        campo = CampoDeFluxo(grade, objetivo)
+
+        for _ in range(4):
+            alteracoes = [(gerador.randrange(20), gerador.randrange(20), gerador.random() < 0.5) for _ in range(3)]
+            campo.atualizar_celulas([a for a in alteracoes if a[:2] != objetivo])
+            self.assertEqual(list(campo.custos), list(CampoDeFluxo(grade, objetivo).custos))
+            for inicio in [(0, 0), (19, 0), (0, 19), (19, 19)]:
+                esperado = grade.astar(inicio, objetivo)
+                caminho = campo.caminho(inicio)
+                if esperado is None:
+                    self.assertIsNone(caminho)
+                else:
+                    self.assertAlmostEqual(self._custo(grade, caminho), self._custo(grade, list(esperado)))
+                    self.assertEqual(campo.proximo_passo(inicio), caminho[1])
+
+    def test_conectividade(self):
+        gerador = random.Random(3)
+        grade = AStarGrade([[gerador.random() < 0.35 for _ in range(20)] for _ in range(20)], cortar_cantos=False)
+        conectividade = grade.conectividade = Conectividade(grade)
+        # mesma partição em componentes que uma rotulação do zero, a menos dos nomes dos rótulos
+        particao = lambda c: sorted(sorted(i for i, r in enumerate(c.rotulos) if r == rotulo) for rotulo in set(c.rotulos) - {-1})
+
+        for _ in range(40):
+            x, y = gerador.randrange(20), gerador.randrange(20)
+            conectividade.atualizar_celula(x, y, gerador.random() < 0.5)
+            self.assertEqual(particao(conectividade), particao(Conectividade(grade)))
+            inicio, objetivo = (gerador.randrange(20), gerador.randrange(20)), (gerador.randrange(20), gerador.randrange(20))
+            if not grade.livre(*objetivo):
+                continue
+            alcancavel = conectividade.alcancavel(inicio, objetivo)
+            grade.conectividade = None
+            self.assertEqual(grade.astar(inicio, objetivo) is not None, alcancavel)
+            grade.conectividade = conectividade
+            if not alcancavel:
+                self.assertIsNone(grade.astar(inicio, objetivo))
+                substituto = conectividade.objetivo_mais_proximo(inicio, objetivo)
+                if substituto is not None:
+                    self.assertTrue(conectividade.alcancavel(inicio, substituto))
+
+        # alterações feitas por outros componentes sobre a mesma grade também atualizam o índice
+        grade = AStarGrade([[False, True, False], [False, True, False], [False, True, False]], cortar_cantos=False)
+        grade.conectividade = Conectividade(grade)
+        self.assertIsNone(grade.astar((0, 0), (2, 0)))
+        CampoDeFluxo(grade, (2, 0)).atualizar_celula(1, 1, False)
+        self.assertEqual(len(grade.astar((0, 0), (2, 0))), 5)
+        AStarHierarquico(grade, tamanho_cluster=2).atualizar_celula(1, 1, True)
+        self.assertIsNone(grade.astar((0, 0), (2, 0)))
+        PlanejadorCooperativo(grade).atualizar_celula(1, 2, False)
+        self.assertIsNotNone(grade.astar((0, 0), (2, 0)))
+
+    def test_mapa_binario(self):
+        labirinto, inicio, objetivo = self._labirinto(4, tamanho=12)
+        esperado = list(AStarGrade.de_linhas(labirinto, diagonais=False).astar(inicio, objetivo))
+
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = os.path.join(pasta, 'labirinto.grd')
+            Mapa.de_linhas(labirinto).salvar(arquivo)
+            grade = AStarGrade.de_mapa(arquivo, diagonais=False)
+            self.assertEqual((grade.largura, grade.altura), (objetivo[0] + 2, objetivo[1] + 2))
+            self.assertEqual(list(grade.astar(inicio, objetivo)), esperado)
+            # serializado pelo caminho enquanto não é alterado; o arquivo nunca é alterado
+            self.assertEqual(pickle.loads(pickle.dumps(grade)).mapa.arquivo, arquivo)
+            grade.bloqueado[0] = 0
+            copia = pickle.loads(pickle.dumps(grade))
+            self.assertIsNone(copia.mapa.arquivo)
+            self.assertEqual(copia.bloqueado[0], 0)
+            self.assertEqual(Mapa.abrir(arquivo).ocupacao[0], 1)
+
+            Mapa.de_grade([[0, 1], [0, 0]], custos=[[1, 2.5], [3, 1]]).salvar(arquivo)
+            mapa = Mapa.abrir(arquivo)
+            self.assertEqual(list(mapa.custos), [1.0, 2.5, 3.0, 1.0])
+            self.assertFalse(mapa.livre(1, 0))
+            del grade, copia, mapa
+
+            with open(arquivo, 'wb') as f:
+                f.write(b'nao e um mapa qualquer')
+            with self.assertRaises(ValueError):
+                Mapa.abrir(arquivo)
+
+    def test_astar_async_mais_recente(self):
+        labirinto, inicio, objetivo = self._labirinto(6, tamanho=30)
+        solucionador = SolucionadorLabirinto(labirinto)
+        esperado = list(solucionador.astar(inicio, objetivo))
+
+        async def rajada():
+            buscas = BuscaMaisRecente(solucionador, fatia_microssegundos=200)
+            pedidos = [asyncio.ensure_future(buscas.buscar(inicio, objetivo)) for _ in range(5)]
+            # o laço de eventos continua respondendo enquanto a busca roda
+            voltas = 0
+            while not pedidos[-1].done():
+                await asyncio.sleep(0)
+                voltas += 1
+            return await asyncio.gather(*pedidos, return_exceptions=True), voltas
+
+        resultados, voltas = asyncio.run(rajada())
+        self.assertEqual(resultados[-1], esperado)
+        self.assertTrue(all(isinstance(r, asyncio.CancelledError) for r in resultados[:-1]))
+        self.assertGreater(voltas, 1)
+
+    def test_planejador_cooperativo(self):
+        gerador = random.Random(5)
+        grade = AStarGrade([[gerador.random() < 0.15 for _ in range(12)] for _ in range(12)], cortar_cantos=False)
+        livres = [(x, y) for y in range(12) for x in range(12) if grade.livre(x, y)]
+        gerador.shuffle(livres)
+        posicoes, objetivos = dict(enumerate(livres[:8])), dict(enumerate(livres[8:16]))
+        planejador = PlanejadorCooperativo(grade, janela=8)
+
+        for t in range(60):
+            planos = planejador.planejar([(a, posicoes[a], objetivos[a]) for a in posicoes], t)
+            proximas = {a: plano[1] if len(plano) > 1 else plano[0] for a, plano in planos.items()}
+            # sem dois agentes na mesma célula nem trocas de lugar
+            self.assertEqual(len(set(proximas.values())), len(proximas))
+            for a in proximas:
+                for b in proximas:
+                    if a != b:
+                        self.assertFalse(proximas[a] == posicoes[b] and proximas[b] == posicoes[a])
+            posicoes = proximas
+            if posicoes == objetivos:
+                break
+        self.assertEqual(posicoes, objetivos)
+        # um campo de distâncias por objetivo, reaproveitado entre os instantes
+        self.assertEqual(len(planejador.campos), len(objetivos))
+
+    def test_desenhar_labirinto(self):
+        # mesmo texto, byte a byte, das versões anteriores de criar_labirinto e desenhar_labirinto
+        labirinto = criar_labirinto(4, 3, semente=2)
+        self.assertEqual(labirinto, '+--+--+--+--+\n|     |     |\n+--+  +--+  +\n|  |  |     |\n'
+                                    '+  +  +  +  +\n|        |  |\n+--+--+--+--+')
+        desenho = desenhar_labirinto(labirinto, [(1, 1), (2, 1), (20, 20)], [(1, 1), (1, 2)])
+        self.assertEqual(desenho, '+--+--+--+--+\n|##   |     |\n+*-+  +--+  +\n|  |  |     |\n'
+                                  '+  +  +  +  +\n|        |  |\n+--+--+--+--+\n')
+
+        arquivo = io.StringIO()
+        escrever_labirinto(arquivo, labirinto, [(1, 1), (2, 1), (20, 20)], [(1, 1), (1, 2)])
+        self.assertEqual(arquivo.getvalue(), desenho)
+
+    def test_astar_em_lote(self):
+        labirinto, inicio, objetivo = self._labirinto(10, tamanho=10)
+        solucionador = SolucionadorLabirinto(labirinto)
+        pares = [(inicio, objetivo), (inicio, (0, 0)), ((4, 1), inicio)]
+        esperado = [list(c) if c else None for c in (solucionador.astar(i, o) for i, o in pares)]
+        self.assertEqual(list(solucionador.astar_em_lote(pares, workers=2, tamanho_lote=1)), esperado)
+
+    def test_cache_de_caminhos(self):
+        labirinto, inicio, objetivo = self._labirinto(11, tamanho=10)
+        cache = CacheDeCaminhos(SolucionadorLabirinto(labirinto), capacidade=4)
+        caminho = cache.astar(inicio, objetivo)
+        self.assertEqual(cache.astar(inicio, objetivo), caminho)
+        meio = caminho[len(caminho) // 2]
+        self.assertEqual(cache.astar(inicio, meio), caminho[:len(caminho) // 2 + 1])
+        self.assertEqual((cache.falhas, cache.acertos, cache.acertos_de_subcaminho), (1, 1, 1))
+        # caminhos de buscas feitas fora do cache (como a BuscaIncremental do Example2)
+        self.assertIsNone(cache.consultar(objetivo, inicio))
+        cache.guardar(objetivo, inicio, caminho[::-1])
+        self.assertEqual(cache.consultar(objetivo, inicio), caminho[::-1])
+        cache.atualizar_mapa(bloqueadas=[meio])
+        self.assertEqual(len(cache), 0)
+
+    def test_cache_de_caminhos_com_mapa_alterado(self):
+        aleatorio = random.Random(6)
+        for simetrico in (False, True):
+            grade = AStarGrade([[aleatorio.random() < 0.25 for _ in range(6)] for _ in range(6)], cortar_cantos=False)
+            cache = CacheDeCaminhos(grade, capacidade=16, simetrico=simetrico)
+            for _ in range(300):
+                x, y = aleatorio.randrange(6), aleatorio.randrange(6)
+                if aleatorio.random() < 0.2:
+                    if grade.bloqueado[y * 6 + x]:
+                        grade.atualizar_celula(x, y, False)
+                        cache.atualizar_mapa(liberadas=[(x, y)])
+                    else:
+                        grade.atualizar_celula(x, y, True)
+                        cache.atualizar_mapa(bloqueadas=[(x, y)])
+                    continue
+                objetivo = (aleatorio.randrange(6), aleatorio.randrange(6))
+                esperado = grade.astar((x, y), objetivo)
+                caminho = cache.astar((x, y), objetivo)
+                if esperado is None:
+                    self.assertIsNone(caminho)
+                    continue
+                self.assertAlmostEqual(self._custo(grade, caminho), self._custo(grade, list(esperado)))
+                for a, b in zip(caminho, caminho[1:]):
+                    self.assertIn(b, grade.vizinhos(a))
+
+    def test_dstar_lite_replaneja(self):
+        labirinto, inicio, objetivo = self._labirinto(7, tamanho=10)
+        solucionador = SolucionadorLabirinto(labirinto)
+        planejador = DStarLite(solucionador, inicio, objetivo)
+        caminho = planejador.proximo_caminho(inicio)
+        self.assertEqual(len(caminho), len(list(solucionador.astar(inicio, objetivo))))
+        # bloqueia uma célula do caminho: o reparo deve coincidir com uma busca do zero
+        x, y = caminho[len(caminho) // 2]
+        solucionador.linhas[y] = solucionador.linhas[y][:x] + '#' + solucionador.linhas[y][x + 1:]
+        planejador.atualizar_custos([(x, y)])
+        novo = planejador.proximo_caminho(caminho[1])
+        esperado = solucionador.astar(caminho[1], objetivo)
+        self.assertEqual(novo is None, esperado is None)
+        if novo is not None:
+            self.assertEqual(len(novo), len(list(esperado)))
+
+    def test_astar_hierarquico(self):
+        labirinto, inicio, objetivo = self._labirinto(12, tamanho=12)
+        grade = AStarGrade.de_linhas(labirinto, diagonais=False)
+        hierarquico = AStarHierarquico(grade, tamanho_cluster=8)
+        caminho = list(hierarquico.astar(inicio, objetivo))
+        self.assertEqual((caminho[0], caminho[-1]), (inicio, objetivo))
+        for a, b in zip(caminho, caminho[1:]):
+            self.assertIn(b, grade.vizinhos(a))
+        # a atualização local deve produzir a mesma abstração que um novo pré-processamento
+        hierarquico.atualizar_celula(*caminho[len(caminho) // 2], bloqueado=True)
+        novo = AStarHierarquico(grade, tamanho_cluster=8)
+        self.assertEqual((hierarquico.inter, hierarquico.intra), (novo.inter, novo.intra))
+
+    def test_astar_hierarquico_quase_otimo(self):
+        aleatorio = random.Random(8)
+        for diagonais in (False, True):
+            grade = AStarGrade([[aleatorio.random() < 0.1 for _ in range(48)] for _ in range(48)], diagonais=diagonais)
+            hierarquico = AStarHierarquico(grade, tamanho_cluster=8)
+            for _ in range(30):
+                inicio = (aleatorio.randrange(48), aleatorio.randrange(48))
+                objetivo = (aleatorio.randrange(48), aleatorio.randrange(48))
+                esperado = grade.astar(inicio, objetivo)
+                if esperado is None or inicio == objetivo or not grade.livre(*inicio):
+                    continue
+                caminho = list(hierarquico.astar(inicio, objetivo))
+                self.assertLessEqual(self._custo(grade, caminho), 1.2 * self._custo(grade, list(esperado)))
 
 if __name__ == '__main__':
     print(resolver_labirinto())
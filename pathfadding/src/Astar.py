@@ -2,9 +2,14 @@
 """ Algoritmo genérico de busca de caminho A-Star """
 
 from abc import ABC, abstractmethod
-from typing import Callable, Dict, Iterable, Union, TypeVar, Generic
+from functools import lru_cache
+from heapq import heappush, heappop
+from itertools import count, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union, TypeVar, Generic
 from math import inf as infinito
-import sortedcontainers  # type: ignore
+from time import perf_counter
+import asyncio
+import multiprocessing
 
 # introduzir tipo genérico
 T = TypeVar("T")
@@ -14,7 +19,7 @@ T = TypeVar("T")
 class NoDeBusca(Generic[T]):
     """Representação de um nó de busca"""
 
-    __slots__ = ("data", "gscore", "fscore", "fechado", "veio_de", "na_lista_aberta")
+    __slots__ = ("data", "gscore", "fscore", "fechado", "veio_de", "na_lista_aberta", "indice_heap", "geracao")
 
     def __init__(
         self, data: T, gscore: float = infinito, fscore: float = infinito
@@ -25,10 +30,19 @@ class NoDeBusca(Generic[T]):
         self.fechado = False
         self.na_lista_aberta = False
         self.veio_de: Union[None, NoDeBusca[T]] = None
+        # posição no heap indexado (ou versão da entrada válida no heap preguiçoso)
+        self.indice_heap = -1
+        # busca da `ArenaDeBusca` a que o estado acima pertence
+        self.geracao = 0
 
     def __lt__(self, b: "NoDeBusca[T]") -> bool:
-        """A ordem natural é baseada no valor fscore e é usada pelas operações do heapq"""
-        return self.fscore < b.fscore
+        """
+        A ordem natural é baseada no valor fscore e é usada pelas operações do heapq.
+        Empates são decididos pelo maior gscore (o nó mais próximo do objetivo).
+        """
+        if self.fscore != b.fscore:
+            return self.fscore < b.fscore
+        return self.gscore > b.gscore
 
 
 ################################################################################
@@ -45,9 +59,51 @@ class DicionarioDeNoDeBusca(Dict[T, NoDeBusca[T]]):
 STipoNo = TypeVar("STipoNo", bound=NoDeBusca)
 
 
-class ListaAberta(Generic[STipoNo]):
+class ListaAbertaBase(ABC, Generic[STipoNo]):
+    """
+    Interface das listas abertas usadas por `AStar.astar`.
+    Os nós são ordenados por fscore e, em caso de empate, pelo maior gscore.
+    """
+
+    @abstractmethod
+    def push(self, item: STipoNo) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def pop(self) -> STipoNo:
+        raise NotImplementedError
+
+    @abstractmethod
+    def remover(self, item: STipoNo) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def atualizar(self, item: STipoNo, gscore: float, fscore: float) -> None:
+        """Altera os scores de um item que já está na lista e restaura a ordem"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def topo(self) -> STipoNo:
+        """Retorna, sem remover, o item de menor fscore"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def limpar(self) -> None:
+        """Esvazia a lista para reutilizá-la em outra busca"""
+        while len(self):
+            self.pop()
+
+
+class ListaAberta(ListaAbertaBase[STipoNo]):
+    """Lista aberta baseada em `sortedcontainers.SortedList`"""
+
     def __init__(self) -> None:
-        self.lista_ordenada = sortedcontainers.SortedList(key=lambda x: x.fscore)
+        import sortedcontainers  # type: ignore
+
+        self.lista_ordenada = sortedcontainers.SortedList(key=lambda x: (x.fscore, -x.gscore))
 
     def push(self, item: STipoNo) -> None:
         item.na_lista_aberta = True
@@ -62,16 +118,328 @@ class ListaAberta(Generic[STipoNo]):
         self.lista_ordenada.remove(item)
         item.na_lista_aberta = False
 
+    def atualizar(self, item: STipoNo, gscore: float, fscore: float) -> None:
+        self.lista_ordenada.remove(item)
+        item.gscore = gscore
+        item.fscore = fscore
+        self.lista_ordenada.add(item)
+
+    def topo(self) -> STipoNo:
+        return self.lista_ordenada[0]
+
+    def limpar(self) -> None:
+        self.lista_ordenada.clear()
+
     def __len__(self) -> int:
         return len(self.lista_ordenada)
 
 
+class ListaAbertaHeapIndexado(ListaAbertaBase[STipoNo]):
+    """
+    Heap binário indexado: cada nó guarda sua posição no heap em `indice_heap`,
+    o que permite remover e diminuir a chave (decrease-key) em O(log n) sem busca.
+    """
+
+    def __init__(self) -> None:
+        self.heap: List[STipoNo] = []
+
+    def push(self, item: STipoNo) -> None:
+        item.na_lista_aberta = True
+        item.indice_heap = len(self.heap)
+        self.heap.append(item)
+        self._subir(item.indice_heap)
+
+    def pop(self) -> STipoNo:
+        heap = self.heap
+        item = heap[0]
+        ultimo = heap.pop()
+        if heap:
+            heap[0] = ultimo
+            ultimo.indice_heap = 0
+            self._descer(0)
+        item.na_lista_aberta = False
+        item.indice_heap = -1
+        return item
+
+    def remover(self, item: STipoNo) -> None:
+        heap = self.heap
+        i = item.indice_heap
+        ultimo = heap.pop()
+        if i < len(heap):
+            heap[i] = ultimo
+            ultimo.indice_heap = i
+            self._subir(i)
+            self._descer(ultimo.indice_heap)
+        item.na_lista_aberta = False
+        item.indice_heap = -1
+
+    def atualizar(self, item: STipoNo, gscore: float, fscore: float) -> None:
+        diminuiu = fscore < item.fscore or (fscore == item.fscore and gscore > item.gscore)
+        item.gscore = gscore
+        item.fscore = fscore
+        if diminuiu:
+            self._subir(item.indice_heap)
+        else:
+            self._descer(item.indice_heap)
+
+    def topo(self) -> STipoNo:
+        return self.heap[0]
+
+    def limpar(self) -> None:
+        self.heap.clear()
+
+    def _subir(self, i: int) -> None:
+        heap = self.heap
+        item = heap[i]
+        while i > 0:
+            p = (i - 1) >> 1
+            pai = heap[p]
+            if not item < pai:
+                break
+            heap[i] = pai
+            pai.indice_heap = i
+            i = p
+        heap[i] = item
+        item.indice_heap = i
+
+    def _descer(self, i: int) -> None:
+        heap = self.heap
+        n = len(heap)
+        item = heap[i]
+        while True:
+            filho = 2 * i + 1
+            if filho >= n:
+                break
+            direito = filho + 1
+            if direito < n and heap[direito] < heap[filho]:
+                filho = direito
+            menor = heap[filho]
+            if not menor < item:
+                break
+            heap[i] = menor
+            menor.indice_heap = i
+            i = filho
+        heap[i] = item
+        item.indice_heap = i
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class ListaAbertaHeapPreguicoso(ListaAbertaBase[STipoNo]):
+    """
+    Lista aberta sobre `heapq` com remoção preguiçosa: remover ou atualizar um nó
+    apenas invalida sua entrada antiga, que é descartada quando chega ao topo.
+    `indice_heap` guarda a versão da entrada válida de cada nó.
+    """
+
+    def __init__(self) -> None:
+        self.heap: List = []
+        self.tamanho = 0
+        self.versao = count()
+
+    def push(self, item: STipoNo) -> None:
+        item.na_lista_aberta = True
+        item.indice_heap = versao = next(self.versao)
+        heappush(self.heap, (item.fscore, -item.gscore, versao, item))
+        self.tamanho += 1
+
+    def pop(self) -> STipoNo:
+        heap = self.heap
+        while True:
+            _, _, versao, item = heappop(heap)
+            if item.na_lista_aberta and item.indice_heap == versao:
+                break
+        item.na_lista_aberta = False
+        item.indice_heap = -1
+        self.tamanho -= 1
+        return item
+
+    def remover(self, item: STipoNo) -> None:
+        item.na_lista_aberta = False
+        item.indice_heap = -1
+        self.tamanho -= 1
+
+    def atualizar(self, item: STipoNo, gscore: float, fscore: float) -> None:
+        item.gscore = gscore
+        item.fscore = fscore
+        item.indice_heap = versao = next(self.versao)
+        heappush(self.heap, (fscore, -gscore, versao, item))
+
+    def topo(self) -> STipoNo:
+        heap = self.heap
+        while True:
+            _, _, versao, item = heap[0]
+            if item.na_lista_aberta and item.indice_heap == versao:
+                return item
+            heappop(heap)
+
+    def limpar(self) -> None:
+        self.heap.clear()
+        self.tamanho = 0
+
+    def __len__(self) -> int:
+        return self.tamanho
+
+
+################################################################################
+class ArenaDeBusca(Generic[T]):
+    """
+    Registros de nós reutilizados entre as buscas de `AStar.astar(..., arena=...)`
+    sobre um mesmo mapa.
+
+    Cada busca recebe um número de geração, e um NoDeBusca cuja `geracao` é
+    antiga é tratado como não visitado (e reiniciado no primeiro acesso), de
+    modo que nada precisa ser limpo entre as buscas. Após o aquecimento, buscas
+    repetidas não alocam nenhum nó; a lista aberta também é reaproveitada.
+
+    `capacidade` limita o número de registros mantidos entre as buscas: uma
+    busca pode ultrapassá-lo, mas o excesso é descartado no início da próxima.
+    Uma arena não pode ser usada por duas buscas ao mesmo tempo.
+    """
+
+    def __init__(self, capacidade: Optional[int] = None) -> None:
+        self.capacidade = capacidade
+        self.nós: Dict[T, NoDeBusca[T]] = {}
+        self.geracao = 0
+        self.lista_aberta: Optional[ListaAbertaBase] = None
+        self.tipo_lista_aberta: Optional[Callable[[], ListaAbertaBase]] = None
+
+    def __len__(self) -> int:
+        return len(self.nós)
+
+    def nova_busca(self, tipo_lista_aberta: Callable[[], ListaAbertaBase]) -> ListaAbertaBase:
+        """inicia uma geração e devolve a lista aberta, vazia"""
+        self.geracao += 1
+        nós = self.nós
+        if self.capacidade is not None:
+            while len(nós) > self.capacidade:
+                nós.popitem()
+        if self.lista_aberta is None or self.tipo_lista_aberta is not tipo_lista_aberta:
+            self.lista_aberta = tipo_lista_aberta()
+            self.tipo_lista_aberta = tipo_lista_aberta
+        else:
+            self.lista_aberta.limpar()
+        return self.lista_aberta
+
+    def obtentor(self) -> Callable[[T], NoDeBusca[T]]:
+        """
+        Função que devolve o registro de um nó na busca atual, reiniciando-o se
+        for de uma busca anterior (as referências ficam resolvidas para o laço do A*).
+        """
+        nós = self.nós
+        buscar = nós.get
+        geracao = self.geracao
+
+        def obter(dado: T) -> NoDeBusca[T]:
+            nó = buscar(dado)
+            if nó is None:
+                nó = nós[dado] = NoDeBusca(dado)
+                nó.geracao = geracao
+            elif nó.geracao != geracao:
+                nó.geracao = geracao
+                nó.gscore = infinito
+                nó.fscore = infinito
+                nó.fechado = False
+                nó.na_lista_aberta = False
+                nó.veio_de = None
+                nó.indice_heap = -1
+            return nó
+
+        return obter
+
+    def limpar(self) -> None:
+        self.nós.clear()
+        self.lista_aberta = None
+        self.tipo_lista_aberta = None
+
+
+################################################################################
+@lru_cache(maxsize=None)
+def _lote_compativel(classe: type) -> bool:
+    """
+    A classe tem um `vizinhos_com_custos` escrito para os mesmos `vizinhos`,
+    `distancia_entre` e `estimativa_de_custo_heuristico` que ela usa, isto é,
+    nenhum dos três foi sobrescrito abaixo da classe que define o lote (uma
+    heurística de marcos misturada à classe, por exemplo).
+    """
+    dona = next((c for c in classe.__mro__ if "vizinhos_com_custos" in vars(c)), None)
+    if dona is None or vars(dona)["vizinhos_com_custos"] is None:
+        return False
+    return all(
+        getattr(classe, nome) is getattr(dona, nome)
+        for nome in ("vizinhos", "distancia_entre", "estimativa_de_custo_heuristico")
+    )
+
+
+################################################################################
+class EstatisticasDeBusca:
+    """
+    Contadores de uma chamada de `astar`, preenchidos quando o objeto é passado
+    em `astar(..., estatisticas=...)`.
+
+    expandidos            nós retirados da lista aberta e expandidos
+    gerados               nós distintos que entraram na lista aberta
+    reaberturas           nós fechados alcançados depois por um caminho mais curto
+                          (não são reabertos; só ocorre com heurísticas inconsistentes)
+    insercoes             chamadas de `push` na lista aberta
+    remocoes              chamadas de `pop` na lista aberta
+    atualizacoes          reposicionamentos (decrease-key) na lista aberta
+    pico_lista_aberta     maior tamanho atingido pela lista aberta
+    chamadas_heuristica   chamadas de `estimativa_de_custo_heuristico`
+    chamadas_distancia    chamadas de `distancia_entre`
+    tempo_*               segundos gastos em cada fase e no total
+
+    Motores especializados preenchem apenas o que conseguem medir sem custo no
+    laço principal; os demais campos ficam None.
+    """
+
+    __slots__ = (
+        "expandidos", "gerados", "reaberturas", "insercoes", "remocoes", "atualizacoes",
+        "pico_lista_aberta", "chamadas_heuristica", "chamadas_distancia",
+        "tempo_total", "tempo_vizinhos", "tempo_heuristica", "tempo_distancia", "tempo_lista_aberta",
+    )
+
+    def __init__(self) -> None:
+        for campo in self.__slots__:
+            setattr(self, campo, 0)
+
+    def como_dicionario(self) -> Dict[str, Any]:
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    def __repr__(self) -> str:
+        return "EstatisticasDeBusca(%s)" % ", ".join("%s=%r" % item for item in self.como_dicionario().items())
+
+
+################################################################################
+# solucionador usado pelos processos de `AStar.astar_em_lote`: herdado via fork
+# (sem cópia dos buffers do mapa) ou recebido uma única vez pelo initializer
+_solucionador_do_processo: Any = None
+
+
+def _iniciar_processo(solucionador: "AStar") -> None:
+    global _solucionador_do_processo
+    _solucionador_do_processo = solucionador
+
+
+def _resolver_lote(tarefa: Tuple[List[Tuple[Any, Any]], Dict[str, Any]]) -> List[Optional[List[Any]]]:
+    pares, opcoes = tarefa
+    resultados = []
+    for inicial, objetivo in pares:
+        caminho = _solucionador_do_processo.astar(inicial, objetivo, **opcoes)
+        resultados.append(None if caminho is None else list(caminho))
+    return resultados
+
+
 ################################################################################*
 
 
 class AStar(ABC, Generic[T]):
     __slots__ = ()
 
+    # lista aberta usada quando `astar` não recebe `tipo_lista_aberta`
+    tipo_lista_aberta: Callable[[], ListaAbertaBase] = ListaAbertaHeapIndexado
+
     @abstractmethod
     def estimativa_de_custo_heuristico(self, atual: T, objetivo: T) -> float:
         """
@@ -98,6 +466,26 @@ class AStar(ABC, Generic[T]):
         """
         raise NotImplementedError
 
+    # Protocolo opcional de expansão em lote: uma subclasse pode definir
+    #     vizinhos_com_custos(nó, objetivo) -> Iterable[Tuple[T, float, float]]
+    # que gera (vizinho, distancia_entre(nó, vizinho), heurística do vizinho até o
+    # objetivo) de uma só vez. `astar` passa então a fazer uma chamada por
+    # expansão em vez de três por aresta. Os resultados devem ser os mesmos de
+    # `vizinhos`, `distancia_entre` e `estimativa_de_custo_heuristico`, que
+    # continuam sendo usados pelas demais buscas. Como o protocolo calcula a
+    # heurística de todos os vizinhos, nem sempre compensa: só vale defini-lo
+    # quando uma medição mostrar ganho. Uma subclasse que sobrescreve um desses
+    # três métodos volta ao laço normal (veja `_lote_compativel`).
+    vizinhos_com_custos: Optional[Callable[[T, T], Iterable[Tuple[T, float, float]]]] = None
+
+    def vizinhos_reversos(self, nó: T) -> Iterable[T]:
+        """
+        Retorna os predecessores de um nó, ou seja, os nós n para os quais `nó`
+        pertence a vizinhos(n). Usado pela busca bidirecional; a implementação
+        padrão supõe um grafo não direcionado e retorna `vizinhos(nó)`.
+        """
+        return self.vizinhos(nó)
+
     def objetivo_alcançado(self, atual: T, objetivo: T) -> bool:
         """
         Retorna verdadeiro quando podemos considerar que 'atual' é o objetivo.
@@ -119,27 +507,78 @@ class AStar(ABC, Generic[T]):
             return reversed(list(_gen()))
 
     def astar(
-        self, inicial: T, objetivo: T, caminho_invertido: bool = False
+        self,
+        inicial: T,
+        objetivo: T,
+        caminho_invertido: bool = False,
+        tipo_lista_aberta: Optional[Callable[[], ListaAbertaBase]] = None,
+        bidirecional: bool = False,
+        estatisticas: Optional[EstatisticasDeBusca] = None,
+        ao_expandir: Optional[Callable[[NoDeBusca[T]], None]] = None,
+        peso: float = 1.0,
+        arena: Optional[ArenaDeBusca[T]] = None,
     ) -> Union[Iterable[T], None]:
+        """
+        `tipo_lista_aberta` escolhe a implementação da lista aberta
+        (`ListaAbertaHeapIndexado`, `ListaAbertaHeapPreguicoso` ou `ListaAberta`);
+        por padrão é usado o atributo de classe `tipo_lista_aberta`.
+
+        Com `bidirecional=True` a busca avança também a partir do objetivo; veja
+        `astar_bidirecional`.
+
+        Com `peso` ε > 1 a busca é um A* ponderado (fscore = g + ε·h): expande
+        bem menos nós e, para heurísticas consistentes, devolve um caminho de
+        custo no máximo ε vezes o ótimo. Veja também `ara`.
+
+        Um objeto `EstatisticasDeBusca` passado em `estatisticas` é preenchido com
+        os contadores da busca, e `ao_expandir` é chamado com cada `NoDeBusca`
+        antes de sua expansão. Sem nenhum dos dois a busca usa o laço normal, sem
+        qualquer custo de instrumentação.
+
+        Com uma `ArenaDeBusca` os nós de busca e a lista aberta de buscas
+        anteriores são reaproveitados, e o caminho é sempre devolvido como lista.
+        """
         if self.objetivo_alcançado(inicial, objetivo):
             return [inicial]
 
-        lista_aberta: ListaAberta[NoDeBusca[T]] = ListaAberta()
-        nós_de_busca: DicionarioDeNoDeBusca[T] = DicionarioDeNoDeBusca()
-        nó_inicial = nós_de_busca[inicial] = NoDeBusca(
-            inicial, gscore=0.0, fscore=self.estimativa_de_custo_heuristico(inicial, objetivo)
-        )
+        if bidirecional:
+            if estatisticas is not None or ao_expandir is not None or peso != 1.0:
+                raise ValueError("estatísticas, ganchos e peso não são suportados na busca bidirecional")
+            return self.astar_bidirecional(inicial, objetivo, caminho_invertido, tipo_lista_aberta)
+
+        if estatisticas is not None or ao_expandir is not None:
+            return self._astar_instrumentado(
+                inicial, objetivo, caminho_invertido, tipo_lista_aberta or self.tipo_lista_aberta,
+                estatisticas if estatisticas is not None else EstatisticasDeBusca(), ao_expandir, peso,
+            )
+
+        criar_lista = tipo_lista_aberta or self.tipo_lista_aberta
+        lista_aberta: ListaAbertaBase[NoDeBusca[T]]
+        if arena is not None:
+            lista_aberta = arena.nova_busca(criar_lista)
+            obter = arena.obtentor()
+        else:
+            lista_aberta = criar_lista()
+            obter = DicionarioDeNoDeBusca().__getitem__
+        nó_inicial = obter(inicial)
+        nó_inicial.gscore = 0.0
+        nó_inicial.fscore = peso * self.estimativa_de_custo_heuristico(inicial, objetivo)
         lista_aberta.push(nó_inicial)
 
+        if self.vizinhos_com_custos is not None and _lote_compativel(type(self)):
+            return self._astar_com_custos(objetivo, caminho_invertido, lista_aberta, obter, peso, arena is not None)
+
         while lista_aberta:
             atual = lista_aberta.pop()
 
             if self.objetivo_alcançado(atual.data, objetivo):
-                return self.reconstruir_caminho(atual, caminho_invertido)
+                caminho = self.reconstruir_caminho(atual, caminho_invertido)
+                # os nós da arena serão reutilizados: o caminho não pode ser lido depois
+                return caminho if arena is None else list(caminho)
 
             atual.fechado = True
 
-            for vizinho in map(lambda n: nós_de_busca[n], self.vizinhos(atual.data)):
+            for vizinho in map(obter, self.vizinhos(atual.data)):
                 if vizinho.fechado:
                     continue
 
@@ -150,23 +589,724 @@ class AStar(ABC, Generic[T]):
                 if gscore_tentativo >= vizinho.gscore:
                     continue
 
-                vizinho_na_lista_aberta = vizinho.na_lista_aberta
-
-                if vizinho_na_lista_aberta:
-                    # temos que remover o item do heap, pois seu score mudou
-                    lista_aberta.remover(vizinho)
-
                 # atualiza o nó
                 vizinho.veio_de = atual
-                vizinho.gscore = gscore_tentativo
-                vizinho.fscore = gscore_tentativo + self.estimativa_de_custo_heuristico(
+                fscore = gscore_tentativo + peso * self.estimativa_de_custo_heuristico(
                     vizinho.data, objetivo
                 )
 
-                lista_aberta.push(vizinho)
+                if vizinho.na_lista_aberta:
+                    # o score mudou: a lista aberta reposiciona o item (decrease-key)
+                    lista_aberta.atualizar(vizinho, gscore_tentativo, fscore)
+                else:
+                    vizinho.gscore = gscore_tentativo
+                    vizinho.fscore = fscore
+                    lista_aberta.push(vizinho)
 
         return None
 
+    def _astar_com_custos(
+        self,
+        objetivo: T,
+        caminho_invertido: bool,
+        lista_aberta: ListaAbertaBase[NoDeBusca[T]],
+        obter: Callable[[T], NoDeBusca[T]],
+        peso: float,
+        materializar: bool,
+    ) -> Union[Iterable[T], None]:
+        """o laço de `astar` sobre `vizinhos_com_custos`"""
+        expandir = self.vizinhos_com_custos
+        alcançado = self.objetivo_alcançado
+        push = lista_aberta.push
+        pop = lista_aberta.pop
+        atualizar = lista_aberta.atualizar
+
+        while lista_aberta:
+            atual = pop()
+
+            if alcançado(atual.data, objetivo):
+                caminho = self.reconstruir_caminho(atual, caminho_invertido)
+                return list(caminho) if materializar else caminho
+
+            atual.fechado = True
+            gscore_atual = atual.gscore
+
+            for dado, custo, h in expandir(atual.data, objetivo):
+                vizinho = obter(dado)
+                if vizinho.fechado:
+                    continue
+                gscore_tentativo = gscore_atual + custo
+                if gscore_tentativo >= vizinho.gscore:
+                    continue
+
+                vizinho.veio_de = atual
+                fscore = gscore_tentativo + peso * h
+                if vizinho.na_lista_aberta:
+                    atualizar(vizinho, gscore_tentativo, fscore)
+                else:
+                    vizinho.gscore = gscore_tentativo
+                    vizinho.fscore = fscore
+                    push(vizinho)
+
+        return None
+
+    def _astar_instrumentado(
+        self,
+        inicial: T,
+        objetivo: T,
+        caminho_invertido: bool,
+        criar_lista: Callable[[], ListaAbertaBase],
+        e: EstatisticasDeBusca,
+        ao_expandir: Optional[Callable[[NoDeBusca[T]], None]],
+        peso: float = 1.0,
+    ) -> Union[Iterable[T], None]:
+        """o mesmo laço de `astar`, contando e cronometrando cada fase"""
+        relogio = perf_counter
+        inicio = relogio()
+        lista_aberta: ListaAbertaBase[NoDeBusca[T]] = criar_lista()
+        nós_de_busca: DicionarioDeNoDeBusca[T] = DicionarioDeNoDeBusca()
+
+        t = relogio()
+        h = self.estimativa_de_custo_heuristico(inicial, objetivo)
+        e.tempo_heuristica += relogio() - t
+        e.chamadas_heuristica += 1
+        nó_inicial = nós_de_busca[inicial] = NoDeBusca(inicial, gscore=0.0, fscore=peso * h)
+        t = relogio()
+        lista_aberta.push(nó_inicial)
+        e.tempo_lista_aberta += relogio() - t
+        e.insercoes += 1
+        e.gerados += 1
+        e.pico_lista_aberta = max(e.pico_lista_aberta, 1)
+
+        try:
+            while lista_aberta:
+                t = relogio()
+                atual = lista_aberta.pop()
+                e.tempo_lista_aberta += relogio() - t
+                e.remocoes += 1
+
+                if self.objetivo_alcançado(atual.data, objetivo):
+                    return self.reconstruir_caminho(atual, caminho_invertido)
+
+                atual.fechado = True
+                e.expandidos += 1
+                if ao_expandir is not None:
+                    ao_expandir(atual)
+
+                t = relogio()
+                vizinhos = list(self.vizinhos(atual.data))
+                e.tempo_vizinhos += relogio() - t
+
+                for vizinho in map(lambda n: nós_de_busca[n], vizinhos):
+                    if vizinho.fechado:
+                        # fora dos contadores: o laço normal nem calcula esta distância
+                        if atual.gscore + self.distancia_entre(atual.data, vizinho.data) < vizinho.gscore:
+                            e.reaberturas += 1
+                        continue
+
+                    t = relogio()
+                    gscore_tentativo = atual.gscore + self.distancia_entre(atual.data, vizinho.data)
+                    e.tempo_distancia += relogio() - t
+                    e.chamadas_distancia += 1
+
+                    if gscore_tentativo >= vizinho.gscore:
+                        continue
+
+                    vizinho.veio_de = atual
+                    t = relogio()
+                    fscore = gscore_tentativo + peso * self.estimativa_de_custo_heuristico(vizinho.data, objetivo)
+                    e.tempo_heuristica += relogio() - t
+                    e.chamadas_heuristica += 1
+
+                    t = relogio()
+                    if vizinho.na_lista_aberta:
+                        lista_aberta.atualizar(vizinho, gscore_tentativo, fscore)
+                        e.tempo_lista_aberta += relogio() - t
+                        e.atualizacoes += 1
+                    else:
+                        if vizinho.gscore == infinito:
+                            e.gerados += 1
+                        vizinho.gscore = gscore_tentativo
+                        vizinho.fscore = fscore
+                        lista_aberta.push(vizinho)
+                        e.tempo_lista_aberta += relogio() - t
+                        e.insercoes += 1
+                        if len(lista_aberta) > e.pico_lista_aberta:
+                            e.pico_lista_aberta = len(lista_aberta)
+
+            return None
+        finally:
+            e.tempo_total += relogio() - inicio
+
+    def busca_incremental(
+        self,
+        inicial: T,
+        objetivo: T,
+        tipo_lista_aberta: Optional[Callable[[], ListaAbertaBase]] = None,
+    ) -> "BuscaIncremental[T]":
+        """
+        Cria uma busca que avança em partes com orçamento de expansões ou de
+        tempo; veja `BuscaIncremental.avancar`.
+        """
+        return BuscaIncremental(self, inicial, objetivo, tipo_lista_aberta)
+
+    async def astar_async(
+        self,
+        inicial: T,
+        objetivo: T,
+        fatia_microssegundos: float = 2000,
+        tipo_lista_aberta: Optional[Callable[[], ListaAbertaBase]] = None,
+    ) -> Union[List[T], None]:
+        """
+        A* cooperativo para clientes asyncio: a busca avança em fatias de no
+        máximo `fatia_microssegundos` (uma `BuscaIncremental`) e devolve o
+        controle ao laço de eventos entre elas, então o laço nunca fica parado
+        mais que uma fatia. Cancelar a tarefa interrompe a busca na próxima
+        fatia, sem consumir mais CPU. Veja `BuscaMaisRecente` para descartar
+        buscas superadas por pedidos mais novos.
+        """
+        busca = self.busca_incremental(inicial, objetivo, tipo_lista_aberta)
+        while True:
+            caminho = busca.avancar(max_microssegundos=fatia_microssegundos)
+            if busca.concluida:
+                return caminho
+            await asyncio.sleep(0)
+
+    def ara(
+        self,
+        inicial: T,
+        objetivo: T,
+        peso_inicial: float = 3.0,
+        passo: float = 0.5,
+        prazo: Optional[float] = None,
+        tipo_lista_aberta: Optional[Callable[[], ListaAbertaBase]] = None,
+    ) -> Iterator[Tuple[List[T], float, float]]:
+        """
+        Busca anytime ARA*: gera tuplas (caminho, custo, limite), onde `limite` é
+        o fator garantido entre `custo` e o custo ótimo (1.0 quando ótimo).
+
+        A primeira solução vem de um A* ponderado com ε = `peso_inicial`; a cada
+        iteração ε diminui `passo` e a busca continua a partir dos nós já
+        abertos, reexpandindo apenas os nós cujo gscore melhorou (a lista de
+        inconsistentes), em vez de recomeçar do zero. Uma solução só é gerada
+        quando o custo diminui. O gerador termina quando a solução é ótima (sem
+        `prazo`, a última gerada é sempre a ótima), quando `prazo` segundos se
+        passaram desde o início (a primeira solução é sempre produzida) ou
+        quando o objetivo é inalcançável (sem gerar nada). O objetivo é
+        comparado por igualdade e a heurística deve ser consistente.
+        """
+        heuristica = self.estimativa_de_custo_heuristico
+        distancia = self.distancia_entre
+        vizinhos = self.vizinhos
+        criar_lista = tipo_lista_aberta or self.tipo_lista_aberta
+        limite_de_tempo = infinito if prazo is None else perf_counter() + prazo
+
+        peso = max(1.0, peso_inicial)
+        nós_de_busca: DicionarioDeNoDeBusca[T] = DicionarioDeNoDeBusca()
+        nó_inicial = nós_de_busca[inicial] = NoDeBusca(inicial, 0.0, peso * heuristica(inicial, objetivo))
+        nó_objetivo = nós_de_busca[objetivo]
+        lista_aberta: ListaAbertaBase[NoDeBusca[T]] = criar_lista()
+        lista_aberta.push(nó_inicial)
+        # nós fechados nesta iteração, e fechados cujo gscore melhorou depois disso
+        fechados: List[NoDeBusca[T]] = []
+        inconsistentes: Dict[T, NoDeBusca[T]] = {}
+        gerou = False
+        melhor_custo = infinito
+
+        while True:
+            while lista_aberta and nó_objetivo.gscore > lista_aberta.topo().fscore:
+                if gerou and prazo is not None and perf_counter() >= limite_de_tempo:
+                    return
+                atual = lista_aberta.pop()
+                atual.fechado = True
+                fechados.append(atual)
+
+                for dado in vizinhos(atual.data):
+                    vizinho = nós_de_busca[dado]
+                    gscore_tentativo = atual.gscore + distancia(atual.data, dado)
+                    if gscore_tentativo >= vizinho.gscore:
+                        continue
+                    vizinho.veio_de = atual
+                    fscore = gscore_tentativo + peso * heuristica(dado, objetivo)
+                    if vizinho.fechado:
+                        vizinho.gscore = gscore_tentativo
+                        vizinho.fscore = fscore
+                        inconsistentes[dado] = vizinho
+                    elif vizinho.na_lista_aberta:
+                        lista_aberta.atualizar(vizinho, gscore_tentativo, fscore)
+                    else:
+                        vizinho.gscore = gscore_tentativo
+                        vizinho.fscore = fscore
+                        lista_aberta.push(vizinho)
+
+            if nó_objetivo.gscore == infinito:
+                return
+            # o gscore do objetivo pode estar desatualizado: um nó fechado que
+            # melhorou já aponta para o novo pai, mas a melhora só chega aos
+            # descendentes na próxima iteração; o custo vem do próprio caminho
+            caminho = list(self.reconstruir_caminho(nó_objetivo))
+            custo = sum(distancia(a, b) for a, b in zip(caminho, caminho[1:]))
+
+            # o custo ótimo é pelo menos o menor g + h entre os nós abertos e inconsistentes
+            pendentes = [lista_aberta.pop() for _ in range(len(lista_aberta))]
+            pendentes.extend(inconsistentes.values())
+            inconsistentes.clear()
+            menor = min((n.gscore + heuristica(n.data, objetivo) for n in pendentes), default=infinito)
+            limite = min(peso, custo / menor) if 0 < menor < infinito else 1.0
+            limite = max(limite, 1.0)
+
+            if custo < melhor_custo:
+                melhor_custo = custo
+                yield caminho, custo, limite
+                gerou = True
+            if limite <= 1.0 or perf_counter() >= limite_de_tempo:
+                return
+
+            peso = max(1.0, peso - passo)
+            for nó in fechados:
+                nó.fechado = False
+            fechados.clear()
+            lista_aberta = criar_lista()
+            for nó in pendentes:
+                nó.fscore = nó.gscore + peso * heuristica(nó.data, objetivo)
+                lista_aberta.push(nó)
+
+    def astar_em_lote(
+        self,
+        pares: Iterable[Tuple[T, T]],
+        workers: Optional[int] = None,
+        tamanho_lote: int = 64,
+        **opcoes,
+    ) -> Iterator[Optional[List[T]]]:
+        """
+        Resolve muitos pares (inicial, objetivo) sobre o mesmo mapa em um pool de
+        processos, gerando os caminhos (listas, ou None) na ordem dos pares à
+        medida que os lotes de `tamanho_lote` pares são concluídos.
+
+        Onde o método de início "fork" está disponível, os processos herdam este
+        solucionador (e os buffers do mapa) sem cópia; nos demais sistemas ele é
+        serializado uma única vez por processo (um `Mapa` aberto de um arquivo é
+        reaberto pelo caminho, sem cópia). `opcoes` são repassadas a `astar`.
+        Com `workers=1` os pares são resolvidos no próprio processo.
+        """
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        pares = iter(pares)
+
+        if workers <= 1:
+            for inicial, objetivo in pares:
+                caminho = self.astar(inicial, objetivo, **opcoes)
+                yield None if caminho is None else list(caminho)
+            return
+
+        def lotes():
+            while True:
+                lote = list(islice(pares, tamanho_lote))
+                if not lote:
+                    return
+                yield lote, opcoes
+
+        global _solucionador_do_processo
+        if "fork" in multiprocessing.get_all_start_methods():
+            contexto = multiprocessing.get_context("fork")
+            _solucionador_do_processo = self
+            pool = contexto.Pool(workers)
+        else:
+            pool = multiprocessing.Pool(workers, initializer=_iniciar_processo, initargs=(self,))
+        try:
+            for resultados in pool.imap(_resolver_lote, lotes()):
+                yield from resultados
+        finally:
+            pool.terminate()
+            _solucionador_do_processo = None
+
+    def astar_bidirecional(
+        self,
+        inicial: T,
+        objetivo: T,
+        caminho_invertido: bool = False,
+        tipo_lista_aberta: Optional[Callable[[], ListaAbertaBase]] = None,
+    ) -> Union[Iterable[T], None]:
+        """
+        A* bidirecional: uma fronteira parte de `inicial` usando `vizinhos` e a
+        outra parte de `objetivo` usando `vizinhos_reversos`. A cada passo é
+        expandida a fronteira com menos nós abertos.
+
+        As duas fronteiras usam a heurística balanceada (média) p(n) =
+        (h(n, objetivo) - h(n, inicial)) / 2, com fscore g + p(n) na frente e
+        g - p(n) atrás. Assim ambas são um Dijkstra sobre os mesmos custos
+        reduzidos e a busca termina quando a soma dos menores fscores das duas
+        fronteiras alcança o custo do melhor caminho já encontrado. Com o
+        critério front-to-end (parar quando uma das fronteiras esgota os nós de
+        fscore menor que esse custo) a busca expandia mais nós que o `astar`
+        unidirecional; o caminho continua ótimo para heurísticas consistentes.
+        O objetivo é comparado por igualdade (`objetivo_alcançado` não é usado).
+        """
+        if inicial == objetivo:
+            return [inicial]
+
+        heuristica = self.estimativa_de_custo_heuristico
+        distancia = self.distancia_entre
+        criar_lista = tipo_lista_aberta or self.tipo_lista_aberta
+
+        def potencial(dado: T) -> float:
+            return (heuristica(dado, objetivo) - heuristica(dado, inicial)) / 2
+
+        frente: DicionarioDeNoDeBusca[T] = DicionarioDeNoDeBusca()
+        tras: DicionarioDeNoDeBusca[T] = DicionarioDeNoDeBusca()
+        lista_frente: ListaAbertaBase[NoDeBusca[T]] = criar_lista()
+        lista_tras: ListaAbertaBase[NoDeBusca[T]] = criar_lista()
+        lista_frente.push(frente.setdefault(inicial, NoDeBusca(inicial, 0.0, potencial(inicial))))
+        lista_tras.push(tras.setdefault(objetivo, NoDeBusca(objetivo, 0.0, -potencial(objetivo))))
+
+        melhor_custo = infinito
+        encontro: Union[None, T] = None
+
+        while lista_frente and lista_tras:
+            if lista_frente.topo().fscore + lista_tras.topo().fscore >= melhor_custo:
+                break
+
+            if len(lista_frente) <= len(lista_tras):
+                lista, nós, outros, para_frente = lista_frente, frente, tras, True
+            else:
+                lista, nós, outros, para_frente = lista_tras, tras, frente, False
+
+            atual = lista.pop()
+            atual.fechado = True
+            expandir = self.vizinhos if para_frente else self.vizinhos_reversos
+
+            for dado in expandir(atual.data):
+                vizinho = nós[dado]
+                if vizinho.fechado:
+                    continue
+
+                custo = distancia(atual.data, dado) if para_frente else distancia(dado, atual.data)
+                gscore_tentativo = atual.gscore + custo
+                if gscore_tentativo >= vizinho.gscore:
+                    continue
+
+                vizinho.veio_de = atual
+                fscore = gscore_tentativo + (potencial(dado) if para_frente else -potencial(dado))
+                if vizinho.na_lista_aberta:
+                    lista.atualizar(vizinho, gscore_tentativo, fscore)
+                else:
+                    vizinho.gscore = gscore_tentativo
+                    vizinho.fscore = fscore
+                    lista.push(vizinho)
+
+                outro = outros.get(dado)
+                if outro is not None and gscore_tentativo + outro.gscore < melhor_custo:
+                    melhor_custo = gscore_tentativo + outro.gscore
+                    encontro = dado
+
+        if encontro is None:
+            return None
+
+        # metade da frente até o nó de encontro, seguida da cadeia de pais da busca de trás
+        caminho = list(self.reconstruir_caminho(frente[encontro]))
+        atual = tras[encontro].veio_de
+        while atual:
+            caminho.append(atual.data)
+            atual = atual.veio_de
+        if caminho_invertido:
+            caminho.reverse()
+        return caminho
+
+
+################################################################################
+class BuscaIncremental(Generic[T]):
+    """
+    Uma busca A* que pode ser interrompida e retomada, criada por
+    `AStar.busca_incremental`.
+
+    Cada chamada de `avancar` expande no máximo `max_expansoes` nós ou roda por
+    no máximo `max_microssegundos`, mantendo a lista aberta e os nós de busca
+    entre as chamadas. Assim uma busca longa pode ser distribuída entre os
+    quadros de um jogo, e o caminho parcial até o nó de menor heurística já
+    alcançado permite começar a andar antes do fim da busca.
+    """
+
+    def __init__(
+        self,
+        solucionador: "AStar[T]",
+        inicial: T,
+        objetivo: T,
+        tipo_lista_aberta: Optional[Callable[[], ListaAbertaBase]] = None,
+    ) -> None:
+        self.solucionador = solucionador
+        self.objetivo = objetivo
+        self.lista_aberta: ListaAbertaBase[NoDeBusca[T]] = (tipo_lista_aberta or solucionador.tipo_lista_aberta)()
+        self.nós_de_busca: DicionarioDeNoDeBusca[T] = DicionarioDeNoDeBusca()
+        self.expandidos = 0
+        # verdadeiro quando a busca terminou; `caminho` é então o resultado final (None se inalcançável)
+        self.concluida = False
+        self.caminho: Union[List[T], None] = None
+
+        h = solucionador.estimativa_de_custo_heuristico(inicial, objetivo)
+        nó_inicial = self.nós_de_busca[inicial] = NoDeBusca(inicial, gscore=0.0, fscore=h)
+        # nó alcançado de menor heurística (empates pelo menor gscore)
+        self.melhor = nó_inicial
+        self.melhor_h = h
+        if solucionador.objetivo_alcançado(inicial, objetivo):
+            self.concluida = True
+            self.caminho = [inicial]
+        else:
+            self.lista_aberta.push(nó_inicial)
+
+    def caminho_parcial(self) -> List[T]:
+        """caminho do início até o nó de menor heurística alcançado até agora"""
+        return list(self.solucionador.reconstruir_caminho(self.melhor))
+
+    def avancar(
+        self, max_expansoes: Optional[int] = None, max_microssegundos: Optional[float] = None
+    ) -> Union[List[T], None]:
+        """
+        Continua a busca dentro do orçamento dado (sem orçamento, vai até o fim).
+
+        Retorna o caminho completo quando o objetivo é alcançado, o caminho
+        parcial quando o orçamento se esgota antes disso, e None quando o
+        objetivo é inalcançável; `concluida` distingue os dois primeiros casos.
+        """
+        if self.concluida:
+            return self.caminho
+
+        solucionador = self.solucionador
+        objetivo = self.objetivo
+        lista_aberta = self.lista_aberta
+        nós_de_busca = self.nós_de_busca
+        heuristica = solucionador.estimativa_de_custo_heuristico
+        distancia = solucionador.distancia_entre
+        vizinhos = solucionador.vizinhos
+        alcançado = solucionador.objetivo_alcançado
+
+        restantes = infinito if max_expansoes is None else max_expansoes
+        prazo = infinito if max_microssegundos is None else perf_counter() + max_microssegundos / 1e6
+
+        while lista_aberta:
+            if restantes <= 0:
+                return self.caminho_parcial()
+
+            atual = lista_aberta.pop()
+            if alcançado(atual.data, objetivo):
+                self.concluida = True
+                self.melhor = atual
+                self.caminho = list(solucionador.reconstruir_caminho(atual))
+                return self.caminho
+
+            atual.fechado = True
+            self.expandidos += 1
+            restantes -= 1
+
+            for vizinho in map(lambda n: nós_de_busca[n], vizinhos(atual.data)):
+                if vizinho.fechado:
+                    continue
+                gscore_tentativo = atual.gscore + distancia(atual.data, vizinho.data)
+                if gscore_tentativo >= vizinho.gscore:
+                    continue
+
+                vizinho.veio_de = atual
+                h = heuristica(vizinho.data, objetivo)
+                fscore = gscore_tentativo + h
+                if vizinho.na_lista_aberta:
+                    lista_aberta.atualizar(vizinho, gscore_tentativo, fscore)
+                else:
+                    vizinho.gscore = gscore_tentativo
+                    vizinho.fscore = fscore
+                    lista_aberta.push(vizinho)
+
+                if h < self.melhor_h or (h == self.melhor_h and gscore_tentativo < self.melhor.gscore):
+                    self.melhor = vizinho
+                    self.melhor_h = h
+
+            # o prazo é verificado após cada expansão, para que toda chamada avance ao menos um nó
+            if max_microssegundos is not None and perf_counter() >= prazo:
+                restantes = 0
+
+        self.concluida = True
+        self.caminho = None
+        return None
+
+
+################################################################################
+class BuscaMaisRecente(Generic[T]):
+    """
+    Coalesce pedidos de busca de um cliente interativo: "o mais recente vence".
+
+    Cada `buscar` cancela a busca ainda em andamento do pedido anterior, cujo
+    `await` termina com `asyncio.CancelledError`, e só a busca mais nova
+    continua consumindo CPU. Uma rajada de cliques custa, portanto, uma fatia
+    por clique superado mais a busca do último.
+
+        buscas = BuscaMaisRecente(solucionador)
+        caminho = await buscas.buscar(inicio, objetivo)
+    """
+
+    def __init__(self, solucionador: "AStar[T]", **opcoes) -> None:
+        self.solucionador = solucionador
+        # repassadas a `AStar.astar_async`
+        self.opcoes = opcoes
+        self.tarefa: Optional["asyncio.Task[Union[List[T], None]]"] = None
+
+    async def buscar(self, inicial: T, objetivo: T) -> Union[List[T], None]:
+        self.cancelar()
+        tarefa = self.tarefa = asyncio.ensure_future(
+            self.solucionador.astar_async(inicial, objetivo, **self.opcoes)
+        )
+        try:
+            return await tarefa
+        finally:
+            if self.tarefa is tarefa:
+                self.tarefa = None
+
+    def cancelar(self) -> None:
+        """cancela a busca em andamento, se houver"""
+        if self.tarefa is not None and not self.tarefa.done():
+            self.tarefa.cancel()
+        self.tarefa = None
+
+
+################################################################################
+class DStarLite(Generic[T]):
+    """
+    Planejador incremental D* Lite sobre um solucionador `AStar` (que fornece
+    `vizinhos`, `vizinhos_reversos`, `distancia_entre` e a heurística).
+
+    A busca é feita do objetivo para a posição atual e seu estado (g, rhs e a
+    fila de prioridades) é mantido entre as chamadas. Quando o mapa muda,
+    `atualizar_custos` reavalia apenas os nós afetados e `proximo_caminho`
+    repara somente a parte da árvore de busca que deixou de ser consistente.
+    """
+
+    def __init__(self, solucionador: AStar[T], inicial: T, objetivo: T) -> None:
+        self.solucionador = solucionador
+        self.inicial = inicial
+        self.objetivo = objetivo
+        # soma das heurísticas entre as posições sucessivas; mantém as chaves antigas como limites inferiores
+        self.km = 0.0
+        self.g: Dict[T, float] = {}
+        self.rhs: Dict[T, float] = {objetivo: 0.0}
+        # fila com remoção preguiçosa: uma entrada só é válida se sua chave for a de `na_fila`
+        self.fila: List = []
+        self.na_fila: Dict[T, Tuple[float, float]] = {}
+        self.contador = count()
+        self._enfileirar(objetivo, (self._h(objetivo), 0.0))
+
+    def _h(self, nó: T) -> float:
+        return self.solucionador.estimativa_de_custo_heuristico(nó, self.inicial)
+
+    def _chave(self, nó: T) -> Tuple[float, float]:
+        m = min(self.g.get(nó, infinito), self.rhs.get(nó, infinito))
+        return (m + self._h(nó) + self.km, m)
+
+    def _enfileirar(self, nó: T, chave: Tuple[float, float]) -> None:
+        self.na_fila[nó] = chave
+        heappush(self.fila, (chave[0], chave[1], next(self.contador), nó))
+
+    def _topo(self) -> Union[None, Tuple[Tuple[float, float], T]]:
+        fila = self.fila
+        while fila:
+            k1, k2, _, nó = fila[0]
+            if self.na_fila.get(nó) == (k1, k2):
+                return (k1, k2), nó
+            heappop(fila)
+        return None
+
+    def _calcular_rhs(self, nó: T) -> float:
+        g = self.g
+        distancia = self.solucionador.distancia_entre
+        return min(
+            (distancia(nó, s) + g.get(s, infinito) for s in self.solucionador.vizinhos(nó)),
+            default=infinito,
+        )
+
+    def _atualizar_fila(self, nó: T) -> None:
+        if self.g.get(nó, infinito) != self.rhs.get(nó, infinito):
+            self._enfileirar(nó, self._chave(nó))
+        else:
+            self.na_fila.pop(nó, None)
+
+    def _atualizar_vertice(self, nó: T) -> None:
+        if nó != self.objetivo:
+            self.rhs[nó] = self._calcular_rhs(nó)
+        self._atualizar_fila(nó)
+
+    def _calcular_caminho_mais_curto(self) -> None:
+        g, rhs = self.g, self.rhs
+        inicial, objetivo = self.inicial, self.objetivo
+        distancia = self.solucionador.distancia_entre
+        predecessores = self.solucionador.vizinhos_reversos
+        while True:
+            topo = self._topo()
+            if topo is None:
+                break
+            chave_antiga, u = topo
+            # nós empatados com a posição atual também são processados, para que o
+            # caminho extraído seguindo os menores g só passe por nós consistentes
+            if chave_antiga[0] > self._chave(inicial)[0] + 1e-9 and rhs.get(inicial, infinito) == g.get(inicial, infinito):
+                break
+
+            chave_nova = self._chave(u)
+            if chave_antiga < chave_nova:
+                self._enfileirar(u, chave_nova)
+            elif g.get(u, infinito) > rhs.get(u, infinito):
+                g[u] = g_u = rhs[u]
+                del self.na_fila[u]
+                for s in predecessores(u):
+                    if s != objetivo:
+                        custo = distancia(s, u) + g_u
+                        if custo < rhs.get(s, infinito):
+                            rhs[s] = custo
+                    self._atualizar_fila(s)
+            else:
+                g_antigo = g[u]
+                g[u] = infinito
+                self._atualizar_fila(u)
+                for s in predecessores(u):
+                    # só recalcula o rhs dos nós cujo melhor sucessor era u
+                    if s != objetivo and rhs.get(s, infinito) == distancia(s, u) + g_antigo:
+                        rhs[s] = self._calcular_rhs(s)
+                    self._atualizar_fila(s)
+
+    def atualizar_custos(self, celulas_alteradas: Iterable[T]) -> None:
+        """
+        Informa que as arestas que entram ou saem de `celulas_alteradas` mudaram
+        (por exemplo, células que foram bloqueadas ou liberadas no mapa do
+        solucionador). O reparo acontece na próxima chamada a `proximo_caminho`.
+        """
+        solucionador = self.solucionador
+        afetados = set()
+        for celula in celulas_alteradas:
+            afetados.add(celula)
+            afetados.update(solucionador.vizinhos(celula))
+            afetados.update(solucionador.vizinhos_reversos(celula))
+        for nó in afetados:
+            self._atualizar_vertice(nó)
+
+    def proximo_caminho(self, posicao_atual: T) -> Union[List[T], None]:
+        """
+        Retorna o caminho ótimo de `posicao_atual` até o objetivo no mapa atual,
+        ou None se o objetivo estiver inalcançável.
+        """
+        if posicao_atual != self.inicial:
+            self.km += self.solucionador.estimativa_de_custo_heuristico(self.inicial, posicao_atual)
+            self.inicial = posicao_atual
+        self._calcular_caminho_mais_curto()
+
+        g = self.g
+        if g.get(posicao_atual, infinito) == infinito:
+            return None
+
+        distancia = self.solucionador.distancia_entre
+        vizinhos = self.solucionador.vizinhos
+        caminho = [posicao_atual]
+        atual = posicao_atual
+        while atual != self.objetivo:
+            atual = min(vizinhos(atual), key=lambda s: distancia(atual, s) + g.get(s, infinito))
+            caminho.append(atual)
+            if len(caminho) > len(g) + 1:
+                return None
+        return caminho
+
 
 ################################################################################
 U = TypeVar("U")
@@ -180,6 +1320,7 @@ def encontrar_caminho(
     função_estimativa_de_custo_heuristico: Callable[[U, U], float] = lambda a, b: infinito,
     função_distancia_entre: Callable[[U, U], float] = lambda a, b: 1.0,
     função_objetivo_alcançado: Callable[[U, U], bool] = lambda a, b: a == b,
+    tipo_lista_aberta: Optional[Callable[[], ListaAbertaBase]] = None,
 ) -> Union[Iterable[U], None]:
     """Uma versão não baseada em classes do algoritmo de busca de caminho"""
 
@@ -196,7 +1337,19 @@ def encontrar_caminho(
         def objetivo_alcançado(self, atual: U, objetivo: U) -> bool:
             return função_objetivo_alcançado(atual, objetivo)
 
-    return EncontrarCaminho().astar(inicial, objetivo, caminho_invertido)
+    return EncontrarCaminho().astar(inicial, objetivo, caminho_invertido, tipo_lista_aberta)
 
 
-__all__ = ["AStar", "encontrar_caminho"]
+__all__ = [
+    "ArenaDeBusca",
+    "AStar",
+    "BuscaIncremental",
+    "BuscaMaisRecente",
+    "DStarLite",
+    "encontrar_caminho",
+    "EstatisticasDeBusca",
+    "ListaAberta",
+    "ListaAbertaBase",
+    "ListaAbertaHeapIndexado",
+    "ListaAbertaHeapPreguicoso",
+]
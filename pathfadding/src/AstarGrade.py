@@ -0,0 +1,681 @@
+# -*- coding: utf-8 -*-
+""" Motor A-Star especializado para grades 2D, com estado em buffers planos """
+
+from array import array
+from heapq import heappush, heappop
+from math import inf as infinito, sqrt
+from time import perf_counter
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+from src.Astar import AStar, ArenaDeBusca, EstatisticasDeBusca, ListaAbertaBase, NoDeBusca
+from src.Mapa import Mapa
+
+# uma posição na grade é sempre uma tupla (x, y)
+Posicao = Tuple[int, int]
+
+
+################################################################################
+def ler_grade(grade: Sequence[Sequence]) -> Tuple[int, int, bytearray]:
+    """
+    Converte uma grade 2D (listas de booleanos/inteiros, array uint8 do NumPy, ...)
+    em (largura, altura, bloqueado), onde `bloqueado` é um buffer plano indexado
+    por y * largura + x. Qualquer valor verdadeiro na grade é um obstáculo.
+    """
+    altura = len(grade)
+    largura = len(grade[0]) if altura else 0
+    bloqueado = bytearray(largura * altura)
+    for y, linha in enumerate(grade):
+        if len(linha) != largura:
+            raise ValueError("todas as linhas da grade devem ter a mesma largura")
+        bloqueado[y * largura:(y + 1) * largura] = bytes(1 if c else 0 for c in linha)
+    return largura, altura, bloqueado
+
+
+def _empurrar_medindo(pico: List[int]) -> Callable[[list, tuple], None]:
+    """`heappush` que também guarda em pico[0] o maior tamanho atingido pela lista"""
+    def empurrar(lista: list, entrada: tuple) -> None:
+        heappush(lista, entrada)
+        if len(lista) > pico[0]:
+            pico[0] = len(lista)
+    return empurrar
+
+
+################################################################################
+class AStarGrade(AStar[Posicao]):
+    """
+    A* para grades uniformes 4/8-conectadas.
+
+    Em vez de um NoDeBusca e uma entrada de dicionário por posição visitada, o
+    gscore, o pai e o estado fechado de cada célula ficam em buffers planos
+    (`array`/`bytearray`) indexados por y * largura + x, alocados na primeira
+    busca e reutilizados pelas seguintes: ao fim de cada busca apenas as células
+    tocadas por ela são reiniciadas, então o custo de uma consulta curta não
+    depende do tamanho da grade. Os nós continuam sendo tuplas (x, y) na
+    interface, e `astar` devolve o caminho no mesmo formato do `AStar.astar`
+    genérico.
+
+    Os métodos abstratos do `AStar` também são implementados, de modo que a
+    mesma instância pode ser usada pelo algoritmo genérico.
+    """
+
+    def __init__(
+        self,
+        grade: Union[Sequence[Sequence], Mapa],
+        diagonais: bool = True,
+        custo_diagonal: float = sqrt(2),
+        cortar_cantos: bool = True,
+    ) -> None:
+        """
+        `grade[y][x]` verdadeiro indica uma célula bloqueada.
+        `cortar_cantos` permite passos diagonais entre dois obstáculos ortogonais,
+        como fazem `CampoFutebolAStar` e `JogoCampoFutebol`.
+        Com um `Mapa`, a ocupação dele é usada sem cópia como `bloqueado`.
+        """
+        if isinstance(grade, Mapa):
+            self.mapa: Optional[Mapa] = grade
+            self.largura, self.altura, self.bloqueado = grade.largura, grade.altura, grade.ocupacao
+        else:
+            self.mapa = None
+            self.largura, self.altura, self.bloqueado = ler_grade(grade)
+        self.diagonais = diagonais
+        self.custo_diagonal = custo_diagonal
+        self.cortar_cantos = cortar_cantos
+
+        # (dx, dy, custo) de cada movimento possível
+        self.movimentos: List[Tuple[int, int, float]] = [(0, -1, 1.0), (0, 1, 1.0), (-1, 0, 1.0), (1, 0, 1.0)]
+        if diagonais:
+            self.movimentos += [
+                (-1, -1, custo_diagonal), (1, -1, custo_diagonal),
+                (-1, 1, custo_diagonal), (1, 1, custo_diagonal),
+            ]
+
+        # índice de componentes conexos (`Conectividade`), consultado antes de cada busca
+        self.conectividade = None
+        # (gscore, veio_de, fechado) reutilizados entre as buscas, None enquanto uma busca os usa
+        self._buffers: Optional[Tuple[array, array, bytearray]] = None
+
+    @classmethod
+    def de_linhas(cls, linhas: Union[str, Sequence[str]], livre: str = " ", **opcoes) -> "AStarGrade":
+        """Constrói a grade a partir de um mapa ASCII (como os de `criar_labirinto`
+        ou o `campo_futebol`), onde apenas o caractere `livre` é transitável"""
+        if isinstance(linhas, str):
+            linhas = linhas.strip().split("\n")
+        return cls([[c != livre for c in linha] for linha in linhas], **opcoes)
+
+    @classmethod
+    def de_obstaculos(cls, largura: int, altura: int, obstaculos: Iterable[Posicao], **opcoes) -> "AStarGrade":
+        """Constrói uma grade `largura` x `altura` livre exceto pelas células (x, y)
+        em `obstaculos`; obstáculos fora da grade são ignorados"""
+        grade = [[False] * largura for _ in range(altura)]
+        for x, y in obstaculos:
+            if 0 <= x < largura and 0 <= y < altura:
+                grade[y][x] = True
+        return cls(grade, **opcoes)
+
+    @classmethod
+    def de_mapa(cls, arquivo: str, **opcoes) -> "AStarGrade":
+        """Abre um mapa salvo por `Mapa.salvar` (mapeado em memória, ver `Mapa.abrir`).
+        A camada de custos, se houver, não é usada: os custos são os dos movimentos"""
+        return cls(Mapa.abrir(arquivo), **opcoes)
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        # os buffers de busca são recriados sob demanda
+        estado["_buffers"] = None
+        # a ocupação de um mapa é uma visão do mapeamento, recriada a partir do `Mapa`
+        if self.mapa is not None and self.bloqueado is self.mapa.ocupacao:
+            del estado["bloqueado"]
+        return estado
+
+    def __setstate__(self, estado) -> None:
+        self.__dict__.update(estado)
+        if "bloqueado" not in estado:
+            self.bloqueado = self.mapa.ocupacao
+
+    async def astar_async(self, inicial: Posicao, objetivo: Posicao, **opcoes) -> Union[List[Posicao], None]:
+        """`AStar.astar_async`, recusando de imediato objetivos fora do componente de `inicial`"""
+        if self.conectividade is not None and not self.conectividade.alcancavel(inicial, objetivo):
+            return None
+        return await super().astar_async(inicial, objetivo, **opcoes)
+
+    def atualizar_celula(self, x: int, y: int, bloqueado: bool) -> None:
+        """
+        Altera uma célula da grade. Toda alteração deve passar por aqui (ou pela
+        `Conectividade` instalada), para que os índices da grade continuem válidos.
+        """
+        if self.conectividade is not None:
+            self.conectividade.atualizar_celula(x, y, bloqueado)
+        else:
+            self.bloqueado[y * self.largura + x] = 1 if bloqueado else 0
+
+    def livre(self, x: int, y: int) -> bool:
+        return 0 <= x < self.largura and 0 <= y < self.altura and not self.bloqueado[y * self.largura + x]
+
+    def estimativa_de_custo_heuristico(self, atual: Posicao, objetivo: Posicao) -> float:
+        """distância de Manhattan (4-conectada) ou octil (8-conectada)"""
+        dx = abs(atual[0] - objetivo[0])
+        dy = abs(atual[1] - objetivo[1])
+        if not self.diagonais:
+            return dx + dy
+        k = min(self.custo_diagonal, 2.0) - 1.0
+        return dx + k * dy if dx > dy else dy + k * dx
+
+    def distancia_entre(self, n1: Posicao, n2: Posicao) -> float:
+        return self.custo_diagonal if n1[0] != n2[0] and n1[1] != n2[1] else 1.0
+
+    def vizinhos(self, nó: Posicao) -> Iterable[Posicao]:
+        x, y = nó
+        livre = self.livre
+        resultado = []
+        for dx, dy, _ in self.movimentos:
+            if not livre(x + dx, y + dy):
+                continue
+            if dx and dy and not self.cortar_cantos and not (livre(x + dx, y) and livre(x, y + dy)):
+                continue
+            resultado.append((x + dx, y + dy))
+        return resultado
+
+    def vizinhos_reversos(self, nó: Posicao) -> Iterable[Posicao]:
+        """a vizinhança é simétrica, exceto que nenhuma célula leva a uma célula bloqueada"""
+        return self.vizinhos(nó) if self.livre(*nó) else []
+
+    def _obter_buffers(self) -> Tuple[array, array, bytearray]:
+        """buffers limpos para uma busca; uma busca simultânea (outra thread) recebe buffers próprios"""
+        buffers = self._buffers
+        self._buffers = None
+        if buffers is None:
+            n = self.largura * self.altura
+            buffers = array("d", [infinito]) * n, array("i", [-1]) * n, bytearray(n)
+        return buffers
+
+    def _devolver_buffers(self, buffers: Tuple[array, array, bytearray], tocados: List[int]) -> None:
+        """reinicia apenas as células tocadas pela busca e guarda os buffers para a próxima"""
+        gscore, veio_de, fechado = buffers
+        for i in tocados:
+            gscore[i] = infinito
+            veio_de[i] = -1
+            fechado[i] = 0
+        self._buffers = buffers
+
+    def reconstruir_caminho_ids(self, último: int, veio_de: array, caminho_invertido=False) -> List[Posicao]:
+        largura = self.largura
+        caminho = []
+        atual = último
+        while atual != -1:
+            y, x = divmod(atual, largura)
+            caminho.append((x, y))
+            atual = veio_de[atual]
+        if not caminho_invertido:
+            caminho.reverse()
+        return caminho
+
+    def _completar_estatisticas(
+        self, e: EstatisticasDeBusca, inicio: float, fechado: bytearray, tocados: List[int], pico: int
+    ) -> None:
+        """contadores obtidos das células tocadas ao fim da busca, sem custo no laço principal"""
+        e.tempo_total += perf_counter() - inicio
+        alcancados = set(tocados)
+        e.expandidos += sum(fechado[i] for i in alcancados)
+        e.gerados += len(alcancados)
+        e.pico_lista_aberta = max(e.pico_lista_aberta or 0, pico)
+        for campo in ("reaberturas", "insercoes", "remocoes", "atualizacoes",
+                      "chamadas_heuristica", "chamadas_distancia", "tempo_vizinhos",
+                      "tempo_heuristica", "tempo_distancia", "tempo_lista_aberta"):
+            setattr(e, campo, None)
+
+    def astar(
+        self,
+        inicial: Posicao,
+        objetivo: Posicao,
+        caminho_invertido: bool = False,
+        tipo_lista_aberta: Optional[Callable[[], ListaAbertaBase]] = None,
+        bidirecional: bool = False,
+        estatisticas: Optional[EstatisticasDeBusca] = None,
+        ao_expandir: Optional[Callable[[NoDeBusca[Posicao]], None]] = None,
+        peso: float = 1.0,
+        arena: Optional[ArenaDeBusca[Posicao]] = None,
+    ) -> Union[Iterable[Posicao], None]:
+        """
+        Mesmo contrato do `AStar.astar`, mas o objetivo é sempre comparado por
+        igualdade de célula (`objetivo_alcançado` não é consultado).
+
+        `estatisticas` recebe apenas o tempo total, os nós expandidos e gerados,
+        contados ao fim da busca, e o pico da lista aberta (contando as
+        entradas obsoletas ainda no heap). `peso` tem o mesmo significado que no
+        `AStar.astar`. Com `ao_expandir`, `tipo_lista_aberta`, `bidirecional` ou
+        `arena` a busca é feita pelo `AStar.astar` genérico, sobre o mesmo grafo.
+        """
+        if ao_expandir is not None or tipo_lista_aberta is not None or bidirecional or arena is not None:
+            return AStar.astar(
+                self, inicial, objetivo, caminho_invertido, tipo_lista_aberta, bidirecional,
+                estatisticas=estatisticas, ao_expandir=ao_expandir, peso=peso, arena=arena,
+            )
+        if inicial == objetivo:
+            return [inicial]
+        inicio = perf_counter() if estatisticas is not None else 0.0
+
+        largura, altura = self.largura, self.altura
+        xi, yi = inicial
+        xo, yo = objetivo
+        if not (0 <= xi < largura and 0 <= yi < altura) or not self.livre(xo, yo):
+            return None
+        if self.conectividade is not None and not self.conectividade.alcancavel(inicial, objetivo):
+            return None
+
+        bloqueado = self.bloqueado
+        buffers = self._obter_buffers()
+        gscore, veio_de, fechado = buffers
+
+        diagonais = self.diagonais
+        cortar_cantos = self.cortar_cantos
+        k = min(self.custo_diagonal, 2.0) - 1.0
+        movimentos = [(dx, dy, dy * largura + dx, custo) for dx, dy, custo in self.movimentos]
+
+        origem = yi * largura + xi
+        alvo = yo * largura + xo
+        gscore[origem] = 0.0
+        # células com gscore, pai ou estado fechado alterados, reiniciadas ao fim
+        tocados = [origem]
+        tocar = tocados.append
+        # entradas (fscore, -gscore, id): empates favorecem o nó mais profundo;
+        # entradas obsoletas são descartadas quando retiradas (remoção preguiçosa)
+        lista_aberta = [(peso * self.estimativa_de_custo_heuristico(inicial, objetivo), -0.0, origem)]
+        # o pico só é medido com `estatisticas`; sem elas o laço chama o próprio heappush
+        pico = [1]
+        empurrar = heappush if estatisticas is None else _empurrar_medindo(pico)
+
+        try:
+            while lista_aberta:
+                _, g, atual = heappop(lista_aberta)
+                if fechado[atual]:
+                    continue
+                if atual == alvo:
+                    if estatisticas is not None:
+                        self._completar_estatisticas(estatisticas, inicio, fechado, tocados, pico[0])
+                    return self.reconstruir_caminho_ids(atual, veio_de, caminho_invertido)
+                fechado[atual] = 1
+                g = -g
+                y, x = divmod(atual, largura)
+
+                for dx, dy, delta, custo in movimentos:
+                    nx = x + dx
+                    ny = y + dy
+                    if nx < 0 or ny < 0 or nx >= largura or ny >= altura:
+                        continue
+                    vizinho = atual + delta
+                    if bloqueado[vizinho] or fechado[vizinho]:
+                        continue
+                    if dx and dy and not cortar_cantos and (bloqueado[atual + dx] or bloqueado[atual + dy * largura]):
+                        continue
+
+                    gscore_tentativo = g + custo
+                    if gscore_tentativo >= gscore[vizinho]:
+                        continue
+
+                    gscore[vizinho] = gscore_tentativo
+                    veio_de[vizinho] = atual
+                    tocar(vizinho)
+                    hx = abs(nx - xo)
+                    hy = abs(ny - yo)
+                    if not diagonais:
+                        h = hx + hy
+                    elif hx > hy:
+                        h = hx + k * hy
+                    else:
+                        h = hy + k * hx
+                    empurrar(lista_aberta, (gscore_tentativo + peso * h, -gscore_tentativo, vizinho))
+
+            if estatisticas is not None:
+                self._completar_estatisticas(estatisticas, inicio, fechado, tocados, pico[0])
+            return None
+        finally:
+            self._devolver_buffers(buffers, tocados)
+
+
+################################################################################
+# direções (dx, dy): 4 retas seguidas das 4 diagonais
+DIRECOES = [(0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (1, -1), (-1, 1), (1, 1)]
+INDICE_DIRECAO = {d: i for i, d in enumerate(DIRECOES)}
+
+
+def _sinal(v: int) -> int:
+    return (v > 0) - (v < 0)
+
+
+class AStarJPS(AStarGrade):
+    """
+    Jump Point Search sobre uma grade uniforme 8-conectada, com ou sem corte de
+    cantos.
+
+    Em vez de gerar todos os vizinhos, cada expansão "salta" em linha reta ou em
+    diagonal até o próximo ponto de salto (uma célula com vizinho forçado), o que
+    elimina a expansão de regiões simétricas em mapas abertos. O caminho
+    devolvido é ótimo e expandido célula a célula, no mesmo formato do `astar`.
+
+    Com `jps_mais=True` as distâncias de salto das 8 direções são pré-calculadas
+    (JPS+) na primeira busca, e cada salto passa a ser uma consulta em tabela;
+    `atualizar_celula` descarta a tabela, refeita na busca seguinte.
+
+    Com `cortar_cantos=True` (o padrão, como no `AStarGrade`, e o movimento de
+    `CampoFutebolAStar`, `JogoCampoFutebol` e `PlotStar`) valem as regras
+    originais de Harabor e Grastien, em que um vizinho forçado aparece à frente
+    do obstáculo; sem corte de cantos, as regras da variante que proíbe passar
+    rente a uma quina.
+
+    Grades 4-conectadas ou com custo diagonal fora de [1, 2] não satisfazem as
+    regras de poda do JPS e usam o `AStarGrade.astar` normal.
+    """
+
+    def __init__(
+        self,
+        grade: Union[Sequence[Sequence], Mapa],
+        diagonais: bool = True,
+        custo_diagonal: float = sqrt(2),
+        cortar_cantos: bool = True,
+        jps_mais: bool = False,
+    ) -> None:
+        super().__init__(grade, diagonais, custo_diagonal, cortar_cantos)
+        self.jps_mais = jps_mais
+        self.distancias_de_salto: Union[array, None] = None
+
+    def atualizar_celula(self, x: int, y: int, bloqueado: bool) -> None:
+        """`AStarGrade.atualizar_celula`, descartando as distâncias de salto se a célula mudar"""
+        if bool(self.bloqueado[y * self.largura + x]) != bool(bloqueado):
+            self.distancias_de_salto = None
+        super().atualizar_celula(x, y, bloqueado)
+
+    def _bloqueado(self, x: int, y: int) -> bool:
+        return not (0 <= x < self.largura and 0 <= y < self.altura) or bool(self.bloqueado[y * self.largura + x])
+
+    def _forcado_reto(self, x: int, y: int, dx: int, dy: int) -> bool:
+        """(x, y), alcançada andando em reta na direção (dx, dy), tem um vizinho forçado"""
+        bloqueado = self._bloqueado
+        if self.cortar_cantos:
+            # o obstáculo ao lado libera a diagonal à frente dele
+            if dx:
+                return (bloqueado(x, y - 1) and not bloqueado(x + dx, y - 1)) or (
+                    bloqueado(x, y + 1) and not bloqueado(x + dx, y + 1)
+                )
+            return (bloqueado(x - 1, y) and not bloqueado(x - 1, y + dy)) or (
+                bloqueado(x + 1, y) and not bloqueado(x + 1, y + dy)
+            )
+        # sem corte de cantos, o obstáculo que acabou de ficar para trás libera o lado
+        if dx:
+            return (not bloqueado(x, y - 1) and bloqueado(x - dx, y - 1)) or (
+                not bloqueado(x, y + 1) and bloqueado(x - dx, y + 1)
+            )
+        return (not bloqueado(x - 1, y) and bloqueado(x - 1, y - dy)) or (
+            not bloqueado(x + 1, y) and bloqueado(x + 1, y - dy)
+        )
+
+    def _forcado_diagonal(self, x: int, y: int, dx: int, dy: int) -> bool:
+        """(x, y), alcançada pela diagonal (dx, dy), tem um vizinho forçado (só com corte de cantos)"""
+        if not self.cortar_cantos:
+            return False
+        bloqueado = self._bloqueado
+        return (bloqueado(x - dx, y) and not bloqueado(x - dx, y + dy)) or (
+            bloqueado(x, y - dy) and not bloqueado(x + dx, y - dy)
+        )
+
+    def _passo_diagonal_livre(self, x: int, y: int, dx: int, dy: int) -> bool:
+        bloqueado = self._bloqueado
+        if bloqueado(x + dx, y + dy):
+            return False
+        return self.cortar_cantos or not (bloqueado(x + dx, y) or bloqueado(x, y + dy))
+
+    def _salto_reto(self, x: int, y: int, dx: int, dy: int, xo: int, yo: int) -> int:
+        """anda de (x, y) na direção reta (dx, dy) até um ponto de salto, o objetivo ou uma parede (-1)"""
+        bloqueado = self._bloqueado
+        forcado = self._forcado_reto
+        while True:
+            x += dx
+            y += dy
+            if bloqueado(x, y):
+                return -1
+            if (x == xo and y == yo) or forcado(x, y, dx, dy):
+                return y * self.largura + x
+
+    def _salto_diagonal(self, x: int, y: int, dx: int, dy: int, xo: int, yo: int) -> int:
+        while True:
+            if not self._passo_diagonal_livre(x, y, dx, dy):
+                return -1
+            x += dx
+            y += dy
+            if x == xo and y == yo or self._forcado_diagonal(x, y, dx, dy):
+                return y * self.largura + x
+            if self._salto_reto(x, y, dx, 0, xo, yo) != -1 or self._salto_reto(x, y, 0, dy, xo, yo) != -1:
+                return y * self.largura + x
+
+    def _direcoes(self, x: int, y: int, pai: int) -> Iterable[Tuple[int, int]]:
+        """direções naturais e forçadas a partir de (x, y), dado o ponto de salto anterior"""
+        if pai == -1:
+            return DIRECOES
+        py, px = divmod(pai, self.largura)
+        dx = _sinal(x - px)
+        dy = _sinal(y - py)
+        bloqueado = self._bloqueado
+        if dx and dy:
+            direcoes = [(dx, 0), (0, dy), (dx, dy)]
+            if self.cortar_cantos:
+                if bloqueado(x - dx, y):
+                    direcoes.append((-dx, dy))
+                if bloqueado(x, y - dy):
+                    direcoes.append((dx, -dy))
+            return direcoes
+        direcoes = [(dx, dy)]
+        for s in (-1, 1):
+            if self.cortar_cantos:
+                if dx:
+                    if bloqueado(x, y + s):
+                        direcoes.append((dx, s))
+                elif bloqueado(x + s, y):
+                    direcoes.append((s, dy))
+            elif dx:
+                if not bloqueado(x, y + s) and bloqueado(x - dx, y + s):
+                    direcoes += [(0, s), (dx, s)]
+            elif not bloqueado(x + s, y) and bloqueado(x + s, y - dy):
+                direcoes += [(s, 0), (s, dy)]
+        return direcoes
+
+    def _sucessores_jps(self, x: int, y: int, pai: int, xo: int, yo: int) -> List[int]:
+        sucessores = []
+        for dx, dy in self._direcoes(x, y, pai):
+            if dx and dy:
+                salto = self._salto_diagonal(x, y, dx, dy, xo, yo)
+            else:
+                salto = self._salto_reto(x, y, dx, dy, xo, yo)
+            if salto != -1:
+                sucessores.append(salto)
+        return sucessores
+
+    def preprocessar(self) -> None:
+        """
+        Calcula as distâncias de salto do JPS+: para cada célula e direção, d > 0
+        indica um ponto de salto a d passos, e d <= 0 indica que há -d passos
+        livres até a próxima parede.
+        """
+        largura, altura = self.largura, self.altura
+        bloqueado = self._bloqueado
+        distancias = array("l", [0]) * (8 * largura * altura)
+        forcado_reto, forcado_diagonal = self._forcado_reto, self._forcado_diagonal
+        passo_diagonal_livre = self._passo_diagonal_livre
+
+        def ordem(dx, dy):
+            # percorre as células de forma que (x + dx, y + dy) seja calculada antes de (x, y)
+            xs = range(largura - 1, -1, -1) if dx > 0 else range(largura)
+            ys = range(altura - 1, -1, -1) if dy > 0 else range(altura)
+            return [(x, y) for y in ys for x in xs]
+
+        for d, (dx, dy) in enumerate(DIRECOES):
+            diagonal = bool(dx and dy)
+            ih = INDICE_DIRECAO[(dx, 0)] if diagonal else 0
+            iv = INDICE_DIRECAO[(0, dy)] if diagonal else 0
+            for x, y in ordem(dx, dy):
+                if bloqueado(x, y):
+                    continue
+                nx, ny = x + dx, y + dy
+                if not passo_diagonal_livre(x, y, dx, dy) if diagonal else bloqueado(nx, ny):
+                    continue
+                proximo = ny * largura + nx
+                if diagonal:
+                    ponto_de_salto = (
+                        distancias[8 * proximo + ih] > 0 or distancias[8 * proximo + iv] > 0
+                        or forcado_diagonal(nx, ny, dx, dy)
+                    )
+                else:
+                    ponto_de_salto = forcado_reto(nx, ny, dx, dy)
+                if ponto_de_salto:
+                    distancia = 1
+                else:
+                    distancia = distancias[8 * proximo + d]
+                    distancia = distancia + 1 if distancia > 0 else distancia - 1
+                distancias[8 * (y * largura + x) + d] = distancia
+
+        self.distancias_de_salto = distancias
+
+    def _sucessores_jps_mais(self, x: int, y: int, pai: int, xo: int, yo: int) -> List[int]:
+        largura = self.largura
+        distancias = self.distancias_de_salto
+        base = 8 * (y * largura + x)
+        gx = xo - x
+        gy = yo - y
+        sucessores = []
+        for dx, dy in self._direcoes(x, y, pai):
+            distancia = distancias[base + INDICE_DIRECAO[(dx, dy)]]
+            alcance = abs(distancia)
+            if dx and dy:
+                # objetivo no quadrante da diagonal: para no ponto em que uma reta leva até ele
+                if _sinal(gx) == dx and _sinal(gy) == dy:
+                    passos = min(abs(gx), abs(gy))
+                    if passos <= alcance:
+                        sucessores.append((y + passos * dy) * largura + x + passos * dx)
+                        continue
+            elif (dx and gy == 0 and _sinal(gx) == dx and abs(gx) <= alcance) or (
+                dy and gx == 0 and _sinal(gy) == dy and abs(gy) <= alcance
+            ):
+                sucessores.append(yo * largura + xo)
+                continue
+            if distancia > 0:
+                sucessores.append((y + distancia * dy) * largura + x + distancia * dx)
+        return sucessores
+
+    def _sucessores_jps_mais_de_bloqueada(self, x: int, y: int, pai: int, xo: int, yo: int) -> List[int]:
+        """JPS+ para uma busca que parte de uma célula bloqueada, que não tem distâncias de salto na tabela"""
+        if self.bloqueado[y * self.largura + x]:
+            return self._sucessores_jps(x, y, pai, xo, yo)
+        return self._sucessores_jps_mais(x, y, pai, xo, yo)
+
+    def _expandir_caminho(self, pontos: List[int]) -> List[Posicao]:
+        """preenche as células entre pontos de salto consecutivos (sempre em reta ou diagonal)"""
+        largura = self.largura
+        y, x = divmod(pontos[0], largura)
+        caminho = [(x, y)]
+        for ponto in pontos[1:]:
+            py, px = divmod(ponto, largura)
+            dx = _sinal(px - x)
+            dy = _sinal(py - y)
+            while (x, y) != (px, py):
+                x += dx
+                y += dy
+                caminho.append((x, y))
+        return caminho
+
+    def astar(
+        self,
+        inicial: Posicao,
+        objetivo: Posicao,
+        caminho_invertido: bool = False,
+        tipo_lista_aberta: Optional[Callable[[], ListaAbertaBase]] = None,
+        bidirecional: bool = False,
+        estatisticas: Optional[EstatisticasDeBusca] = None,
+        ao_expandir: Optional[Callable[[NoDeBusca[Posicao]], None]] = None,
+        peso: float = 1.0,
+        arena: Optional[ArenaDeBusca[Posicao]] = None,
+    ) -> Union[Iterable[Posicao], None]:
+        if (
+            ao_expandir is not None or tipo_lista_aberta is not None or bidirecional or arena is not None
+            or not self.diagonais or not 1.0 <= self.custo_diagonal <= 2.0
+        ):
+            return super().astar(
+                inicial, objetivo, caminho_invertido, tipo_lista_aberta, bidirecional,
+                estatisticas=estatisticas, ao_expandir=ao_expandir, peso=peso, arena=arena,
+            )
+        if inicial == objetivo:
+            return [inicial]
+        # nos contadores, "expandidos" e "gerados" se referem aos pontos de salto
+        inicio = perf_counter() if estatisticas is not None else 0.0
+
+        largura, altura = self.largura, self.altura
+        xi, yi = inicial
+        xo, yo = objetivo
+        if not (0 <= xi < largura and 0 <= yi < altura) or not self.livre(xo, yo):
+            return None
+        if self.conectividade is not None and not self.conectividade.alcancavel(inicial, objetivo):
+            return None
+
+        if self.jps_mais:
+            if self.distancias_de_salto is None:
+                self.preprocessar()
+            sucessores = self._sucessores_jps_mais
+            if self.bloqueado[yi * largura + xi]:
+                sucessores = self._sucessores_jps_mais_de_bloqueada
+        else:
+            sucessores = self._sucessores_jps
+
+        buffers = self._obter_buffers()
+        gscore, veio_de, fechado = buffers
+        k = self.custo_diagonal - 1.0
+
+        origem = yi * largura + xi
+        alvo = yo * largura + xo
+        gscore[origem] = 0.0
+        tocados = [origem]
+        tocar = tocados.append
+        lista_aberta = [(peso * self.estimativa_de_custo_heuristico(inicial, objetivo), -0.0, origem)]
+        # o pico só é medido com `estatisticas`; sem elas o laço chama o próprio heappush
+        pico = [1]
+        empurrar = heappush if estatisticas is None else _empurrar_medindo(pico)
+
+        try:
+            while lista_aberta:
+                _, g, atual = heappop(lista_aberta)
+                if fechado[atual]:
+                    continue
+                if atual == alvo:
+                    if estatisticas is not None:
+                        self._completar_estatisticas(estatisticas, inicio, fechado, tocados, pico[0])
+                    pontos = self.reconstruir_caminho_ids(atual, veio_de)
+                    caminho = self._expandir_caminho([y * largura + x for x, y in pontos])
+                    if caminho_invertido:
+                        caminho.reverse()
+                    return caminho
+                fechado[atual] = 1
+                g = -g
+                y, x = divmod(atual, largura)
+
+                for vizinho in sucessores(x, y, veio_de[atual], xo, yo):
+                    if fechado[vizinho]:
+                        continue
+                    ny, nx = divmod(vizinho, largura)
+                    # o trecho entre pontos de salto é uma reta ou uma diagonal
+                    ax = abs(nx - x)
+                    ay = abs(ny - y)
+                    gscore_tentativo = g + (ax + k * ay if ax > ay else ay + k * ax)
+                    if gscore_tentativo >= gscore[vizinho]:
+                        continue
+                    gscore[vizinho] = gscore_tentativo
+                    veio_de[vizinho] = atual
+                    tocar(vizinho)
+                    hx = abs(nx - xo)
+                    hy = abs(ny - yo)
+                    h = hx + k * hy if hx > hy else hy + k * hx
+                    empurrar(lista_aberta, (gscore_tentativo + peso * h, -gscore_tentativo, vizinho))
+
+            if estatisticas is not None:
+                self._completar_estatisticas(estatisticas, inicio, fechado, tocados, pico[0])
+            return None
+        finally:
+            self._devolver_buffers(buffers, tocados)
+
+
+__all__ = ["AStarGrade", "AStarJPS", "ler_grade"]
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+""" Cache LRU de caminhos sobre um solucionador A-Star """
+
+from collections import OrderedDict
+from typing import Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
+
+from src.Astar import AStar
+
+T = TypeVar("T")
+
+
+################################################################################
+class CacheDeCaminhos(Generic[T]):
+    """
+    Guarda os caminhos ótimos devolvidos por `solucionador.astar`, com no máximo
+    `capacidade` entradas (a menos usada recentemente é descartada primeiro).
+
+    Uma consulta é respondida sem busca quando o par (inicial, objetivo) já está
+    no cache ou quando algum caminho guardado passa por `inicial` e depois por
+    `objetivo` (todo trecho de um caminho ótimo também é ótimo). Com
+    `simetrico=True` o trecho também pode ser usado no sentido inverso, o que só
+    vale para grafos não direcionados.
+
+    O cache não observa o mapa: quem altera os obstáculos deve chamar
+    `atualizar_mapa` com as células alteradas, e somente as entradas afetadas
+    são descartadas.
+    """
+
+    def __init__(self, solucionador: AStar[T], capacidade: int = 1024, simetrico: bool = False) -> None:
+        self.solucionador = solucionador
+        self.capacidade = capacidade
+        self.simetrico = simetrico
+        # (inicial, objetivo) -> (caminho, custo); caminho None indica objetivo inalcançável
+        self.caminhos: "OrderedDict[Tuple[T, T], Tuple[Optional[Tuple[T, ...]], float]]" = OrderedDict()
+        # célula -> chaves dos caminhos que passam por ela
+        self.por_celula: Dict[T, Set[Tuple[T, T]]] = {}
+        # incrementada a cada alteração do mapa; o conteúdo do cache sempre se refere à versão atual
+        self.versao = 0
+        self.acertos = 0
+        self.acertos_de_subcaminho = 0
+        self.falhas = 0
+
+    def __len__(self) -> int:
+        return len(self.caminhos)
+
+    def astar(self, inicial: T, objetivo: T, caminho_invertido: bool = False) -> Optional[List[T]]:
+        encontrado, caminho = self._procurar(inicial, objetivo)
+        if not encontrado:
+            self.falhas += 1
+            resultado = self.solucionador.astar(inicial, objetivo)
+            caminho = None if resultado is None else tuple(resultado)
+            self._guardar((inicial, objetivo), caminho)
+        return self._como_lista(caminho, caminho_invertido)
+
+    def consultar(self, inicial: T, objetivo: T, caminho_invertido: bool = False) -> Optional[List[T]]:
+        """
+        Como `astar`, mas sem buscar: None quando a resposta não está no cache
+        (ou o objetivo é inalcançável). Junto com `guardar`, permite usar o cache
+        com buscas feitas fora dele, como uma `BuscaIncremental`.
+        """
+        encontrado, caminho = self._procurar(inicial, objetivo)
+        if not encontrado:
+            self.falhas += 1
+        return self._como_lista(caminho, caminho_invertido)
+
+    def guardar(self, inicial: T, objetivo: T, caminho: Optional[Iterable[T]]) -> None:
+        """guarda o resultado de uma busca ótima feita fora do cache (None se inalcançável)"""
+        self._guardar((inicial, objetivo), None if caminho is None else tuple(caminho))
+
+    def _procurar(self, inicial: T, objetivo: T) -> Tuple[bool, Optional[Tuple[T, ...]]]:
+        chave = (inicial, objetivo)
+        entrada = self.caminhos.get(chave)
+        if entrada is not None:
+            self.caminhos.move_to_end(chave)
+            self.acertos += 1
+            return True, entrada[0]
+        caminho = self._subcaminho(inicial, objetivo)
+        if caminho is not None:
+            self.acertos_de_subcaminho += 1
+            return True, caminho
+        return False, None
+
+    @staticmethod
+    def _como_lista(caminho: Optional[Tuple[T, ...]], caminho_invertido: bool) -> Optional[List[T]]:
+        if caminho is None:
+            return None
+        return list(reversed(caminho)) if caminho_invertido else list(caminho)
+
+    def _subcaminho(self, inicial: T, objetivo: T) -> Optional[Tuple[T, ...]]:
+        chaves_inicial = self.por_celula.get(inicial)
+        chaves_objetivo = self.por_celula.get(objetivo)
+        if not chaves_inicial or not chaves_objetivo:
+            return None
+        for chave in chaves_inicial & chaves_objetivo:
+            caminho = self.caminhos[chave][0]
+            i = caminho.index(inicial)
+            j = caminho.index(objetivo)
+            if i <= j:
+                self.caminhos.move_to_end(chave)
+                return caminho[i:j + 1]
+            # o início guardado pode estar bloqueado (a busca parte de qualquer
+            # célula), mas não pode ser o objetivo do trecho invertido
+            if self.simetrico and (j > 0 or caminho[0] in self.solucionador.vizinhos(caminho[1])):
+                self.caminhos.move_to_end(chave)
+                return caminho[j:i + 1][::-1]
+        return None
+
+    def _guardar(self, chave: Tuple[T, T], caminho: Optional[Tuple[T, ...]]) -> None:
+        if chave in self.caminhos:
+            self._descartar(chave)
+        custo = 0.0
+        if caminho is not None:
+            distancia = self.solucionador.distancia_entre
+            custo = sum(distancia(a, b) for a, b in zip(caminho, caminho[1:]))
+            for celula in caminho:
+                self.por_celula.setdefault(celula, set()).add(chave)
+        self.caminhos[chave] = (caminho, custo)
+        while len(self.caminhos) > self.capacidade:
+            self._descartar(next(iter(self.caminhos)))
+
+    def _descartar(self, chave: Tuple[T, T]) -> None:
+        caminho, _ = self.caminhos.pop(chave)
+        for celula in caminho or ():
+            chaves = self.por_celula[celula]
+            chaves.discard(chave)
+            if not chaves:
+                del self.por_celula[celula]
+
+    def atualizar_mapa(self, bloqueadas: Iterable[T] = (), liberadas: Iterable[T] = ()) -> None:
+        """
+        Informa ao cache que as células `bloqueadas` deixaram de ser transitáveis
+        e que as `liberadas` passaram a ser.
+
+        Caminhos que atravessam uma célula bloqueada são descartados. Alterar uma
+        célula também pode mudar os movimentos entre as vizinhas dela (uma
+        diagonal que passa rente a ela, sem corte de cantos), então os caminhos
+        que passam por uma vizinha de uma célula bloqueada são conferidos passo a
+        passo com `vizinhos`. Uma célula liberada c só pode encurtar um caminho
+        de custo C entre s e o se o novo caminho passar por c ou por uma vizinha
+        v dela com h(s, v) + h(v, o) < C, então apenas esses caminhos (e os
+        resultados "inalcançável") são descartados.
+        """
+        self.versao += 1
+        descartar = set()
+        conferir = set()
+        for celula in bloqueadas:
+            descartar.update(self.por_celula.get(celula, ()))
+            for vizinha in self._vizinhanca(celula):
+                conferir.update(self.por_celula.get(vizinha, ()))
+        for chave in conferir - descartar:
+            if not self._valido(self.caminhos[chave][0]):
+                descartar.add(chave)
+
+        liberadas = list(liberadas)
+        if liberadas:
+            heuristica = self.solucionador.estimativa_de_custo_heuristico
+            candidatas = set(liberadas)
+            for celula in liberadas:
+                candidatas.update(self._vizinhanca(celula))
+            for chave, (caminho, custo) in self.caminhos.items():
+                if caminho is None:
+                    descartar.add(chave)
+                    continue
+                inicial, objetivo = chave
+                for celula in candidatas:
+                    if heuristica(inicial, celula) + heuristica(celula, objetivo) < custo:
+                        descartar.add(chave)
+                        break
+
+        for chave in descartar:
+            self._descartar(chave)
+
+    def _vizinhanca(self, celula: T) -> Set[T]:
+        solucionador = self.solucionador
+        return set(solucionador.vizinhos(celula)) | set(solucionador.vizinhos_reversos(celula))
+
+    def _valido(self, caminho: Tuple[T, ...]) -> bool:
+        """todos os passos do caminho ainda são movimentos permitidos"""
+        vizinhos = self.solucionador.vizinhos
+        return all(b in vizinhos(a) for a, b in zip(caminho, caminho[1:]))
+
+    def limpar(self) -> None:
+        self.versao += 1
+        self.caminhos.clear()
+        self.por_celula.clear()
+
+
+__all__ = ["CacheDeCaminhos"]
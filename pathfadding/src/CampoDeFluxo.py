@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+""" Campo de fluxo: distâncias até um objetivo comum para muitos agentes """
+
+from array import array
+from heapq import heappush, heappop
+from math import inf as infinito
+from typing import Iterable, List, Optional, Set, Tuple
+
+from src.AstarGrade import AStarGrade, Posicao
+
+
+################################################################################
+class CampoDeFluxo:
+    """
+    Um Dijkstra reverso a partir de `objetivo` sobre a grade de um `AStarGrade`
+    guarda, para cada célula, o custo até o objetivo (`custos`, `array('d')`) e
+    a próxima célula de um caminho ótimo (`proximos`, `array('l')`, -1 quando
+    não há caminho), ambos indexados por y * largura + x.
+
+    Com o campo pronto, o próximo passo de qualquer agente é uma consulta e o
+    caminho completo custa O(tamanho do caminho), então N agentes indo para o
+    mesmo objetivo custam uma busca em vez de N. Os movimentos, custos e a
+    regra de cantos são os da grade.
+
+    Quando obstáculos mudam, `atualizar_celulas` repara apenas as células cujo
+    caminho passava pelas células alteradas ou que podem melhorar com elas.
+    """
+
+    def __init__(self, grade: AStarGrade, objetivo: Posicao) -> None:
+        self.grade = grade
+        self.objetivo = objetivo
+        n = grade.largura * grade.altura
+        self.custos = array("d", [infinito]) * n
+        self.proximos = array("l", [-1]) * n
+        self.calcular()
+
+    ################################################################################
+    # vizinhança
+
+    def _arestas(self, i: int) -> Iterable[Tuple[int, float]]:
+        """(célula vizinha, custo) dos movimentos válidos a partir da célula livre i"""
+        grade = self.grade
+        largura, altura, bloqueado = grade.largura, grade.altura, grade.bloqueado
+        y, x = divmod(i, largura)
+        for dx, dy, custo in grade.movimentos:
+            nx = x + dx
+            ny = y + dy
+            if nx < 0 or ny < 0 or nx >= largura or ny >= altura:
+                continue
+            j = i + dy * largura + dx
+            if bloqueado[j]:
+                continue
+            if dx and dy and not grade.cortar_cantos and (bloqueado[i + dx] or bloqueado[i + dy * largura]):
+                continue
+            yield j, custo
+
+    def _melhor_vizinho(self, i: int) -> Tuple[float, int]:
+        custos = self.custos
+        melhor, proximo = infinito, -1
+        for j, custo in self._arestas(i):
+            if custos[j] + custo < melhor:
+                melhor, proximo = custos[j] + custo, j
+        return melhor, proximo
+
+    def _propagar(self, fila: List[Tuple[float, int]]) -> None:
+        """Dijkstra reverso: os movimentos entre células livres são simétricos"""
+        custos, proximos = self.custos, self.proximos
+        while fila:
+            custo, i = heappop(fila)
+            if custo > custos[i]:
+                continue
+            for j, passo in self._arestas(i):
+                novo = custo + passo
+                if novo < custos[j]:
+                    custos[j] = novo
+                    proximos[j] = i
+                    heappush(fila, (novo, j))
+
+    ################################################################################
+    # construção e reparo
+
+    def calcular(self) -> None:
+        grade = self.grade
+        n = grade.largura * grade.altura
+        self.custos[:] = array("d", [infinito]) * n
+        self.proximos[:] = array("l", [-1]) * n
+        xo, yo = self.objetivo
+        if not grade.livre(xo, yo):
+            return
+        alvo = yo * grade.largura + xo
+        self.custos[alvo] = 0.0
+        self._propagar([(0.0, alvo)])
+
+    def atualizar_celula(self, x: int, y: int, bloqueado: bool) -> None:
+        self.atualizar_celulas([(x, y, bloqueado)])
+
+    def atualizar_celulas(self, alteracoes: Iterable[Tuple[int, int, bool]]) -> None:
+        """
+        Aplica as alterações (x, y, bloqueado) na grade e repara o campo.
+
+        As células cujo caminho usava um movimento que deixou de ser válido (e
+        toda a subárvore que dependia delas) são invalidadas e recebem de novo o
+        melhor custo entre os vizinhos válidos; as células liberadas e seus
+        vizinhos são reavaliados. Um Dijkstra a partir dessas sementes propaga
+        apenas as melhorias.
+        """
+        grade = self.grade
+        largura, altura, bloqueado = grade.largura, grade.altura, grade.bloqueado
+        custos, proximos = self.custos, self.proximos
+
+        alteradas = []
+        for x, y, valor in alteracoes:
+            grade.atualizar_celula(x, y, valor)
+            alteradas.append(y * largura + x)
+        if (self.objetivo[1] * largura + self.objetivo[0]) in alteradas:
+            self.calcular()
+            return
+
+        def vizinhanca(i: int) -> Iterable[int]:
+            y, x = divmod(i, largura)
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    if 0 <= x + dx < largura and 0 <= y + dy < altura:
+                        yield i + dy * largura + dx
+
+        # células cujo próximo passo deixou de ser um movimento válido
+        invalidas: Set[int] = set()
+        pendentes = []
+        for i in alteradas:
+            for j in vizinhanca(i):
+                if proximos[j] != -1 and (bloqueado[j] or proximos[j] not in {k for k, _ in self._arestas(j)}):
+                    pendentes.append(j)
+        # ... e toda a subárvore que chega ao objetivo através delas
+        while pendentes:
+            i = pendentes.pop()
+            if i in invalidas:
+                continue
+            invalidas.add(i)
+            custos[i] = infinito
+            proximos[i] = -1
+            for j in vizinhanca(i):
+                if proximos[j] == i:
+                    pendentes.append(j)
+
+        fila: List[Tuple[float, int]] = []
+        reavaliar = set(invalidas)
+        for i in alteradas:
+            reavaliar.update(vizinhanca(i))
+        for i in reavaliar:
+            if bloqueado[i]:
+                custos[i] = infinito
+                proximos[i] = -1
+                continue
+            custo, proximo = self._melhor_vizinho(i)
+            if custo < custos[i]:
+                custos[i] = custo
+                proximos[i] = proximo
+                heappush(fila, (custo, i))
+        self._propagar(fila)
+
+    ################################################################################
+    # consultas
+
+    def custo(self, posicao: Posicao) -> float:
+        """custo do caminho ótimo de `posicao` até o objetivo (infinito se não houver)"""
+        x, y = posicao
+        grade = self.grade
+        if not (0 <= x < grade.largura and 0 <= y < grade.altura):
+            return infinito
+        i = y * grade.largura + x
+        if grade.bloqueado[i]:
+            # um agente sobre um obstáculo ainda pode sair dele
+            return self._melhor_vizinho(i)[0]
+        return self.custos[i]
+
+    def proximo_passo(self, posicao: Posicao) -> Optional[Posicao]:
+        """a próxima célula de um caminho ótimo, ou None no objetivo ou sem caminho"""
+        x, y = posicao
+        grade = self.grade
+        if not (0 <= x < grade.largura and 0 <= y < grade.altura):
+            return None
+        i = y * grade.largura + x
+        proximo = self._melhor_vizinho(i)[1] if grade.bloqueado[i] else self.proximos[i]
+        if proximo == -1:
+            return None
+        py, px = divmod(proximo, grade.largura)
+        return px, py
+
+    def caminho(self, posicao: Posicao) -> Optional[List[Posicao]]:
+        """o caminho completo de `posicao` até o objetivo, no formato do `astar`"""
+        if posicao == self.objetivo:
+            return [posicao]
+        if self.custo(posicao) == infinito:
+            return None
+        caminho = [posicao]
+        passo = self.proximo_passo(posicao)
+        while passo is not None:
+            caminho.append(passo)
+            passo = self.proximo_passo(passo)
+        return caminho
+
+
+__all__ = ["CampoDeFluxo"]
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+""" Componentes conexos de uma grade, para recusar objetivos inalcançáveis em O(1) """
+
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+from src.AstarGrade import AStarGrade, Posicao
+
+
+################################################################################
+class Conectividade:
+    """
+    Rótulo do componente conexo de cada célula livre da grade de um
+    `AStarGrade` (-1 nas bloqueadas), em um `array('l')` indexado por
+    y * largura + x, segundo os movimentos e a regra de cantos da grade.
+
+    Instalado em `grade.conectividade`, faz `AStarGrade.astar` devolver None
+    imediatamente quando inicial e objetivo estão em componentes diferentes, em
+    vez de esgotar toda a região alcançável. `atualizar_celula` mantém os
+    rótulos quando uma célula muda, e é chamado por `grade.atualizar_celula`,
+    por onde passam as alterações do `CampoDeFluxo`, do `AStarHierarquico` e
+    do `PlanejadorCooperativo`. Liberar uma célula une os componentes
+    vizinhos, e bloqueá-la só exige uma busca quando os vizinhos deixam de se
+    alcançar pela volta da célula.
+    """
+
+    def __init__(self, grade: AStarGrade) -> None:
+        self.grade = grade
+        self.rotulos = array("l", [-1]) * (grade.largura * grade.altura)
+        self.tamanhos: Dict[int, int] = {}
+        self.proximo_rotulo = 0
+        self.calcular()
+
+    def _vizinhos(self, i: int) -> Iterable[int]:
+        """células livres alcançáveis em um movimento a partir da célula i"""
+        grade = self.grade
+        largura, altura, bloqueado = grade.largura, grade.altura, grade.bloqueado
+        y, x = divmod(i, largura)
+        for dx, dy, _ in grade.movimentos:
+            nx = x + dx
+            ny = y + dy
+            if nx < 0 or ny < 0 or nx >= largura or ny >= altura:
+                continue
+            j = i + dy * largura + dx
+            if bloqueado[j]:
+                continue
+            if dx and dy and not grade.cortar_cantos and (bloqueado[i + dx] or bloqueado[i + dy * largura]):
+                continue
+            yield j
+
+    def _rotular(self, origem: int, rotulo: int) -> int:
+        """rotula o componente de `origem` (busca em largura) e devolve seu tamanho"""
+        rotulos = self.rotulos
+        rotulos[origem] = rotulo
+        fila = deque([origem])
+        tamanho = 0
+        while fila:
+            i = fila.popleft()
+            tamanho += 1
+            for j in self._vizinhos(i):
+                if rotulos[j] != rotulo:
+                    rotulos[j] = rotulo
+                    fila.append(j)
+        return tamanho
+
+    def _novo_rotulo(self) -> int:
+        rotulo = self.proximo_rotulo
+        self.proximo_rotulo += 1
+        return rotulo
+
+    def calcular(self) -> None:
+        bloqueado = self.grade.bloqueado
+        rotulos = self.rotulos
+        rotulos[:] = array("l", [-1]) * len(rotulos)
+        self.tamanhos.clear()
+        for i in range(len(rotulos)):
+            if rotulos[i] == -1 and not bloqueado[i]:
+                rotulo = self._novo_rotulo()
+                self.tamanhos[rotulo] = self._rotular(i, rotulo)
+
+    ################################################################################
+    # consultas
+
+    def rotulo(self, posicao: Posicao) -> int:
+        x, y = posicao
+        grade = self.grade
+        if not (0 <= x < grade.largura and 0 <= y < grade.altura):
+            return -1
+        return self.rotulos[y * grade.largura + x]
+
+    def _rotulos_de_saida(self, posicao: Posicao) -> List[int]:
+        """componentes alcançáveis a partir de `posicao`; uma célula bloqueada ainda pode sair para os vizinhos"""
+        rotulo = self.rotulo(posicao)
+        if rotulo != -1:
+            return [rotulo]
+        x, y = posicao
+        grade = self.grade
+        if not (0 <= x < grade.largura and 0 <= y < grade.altura):
+            return []
+        return list({self.rotulos[j] for j in self._vizinhos(y * grade.largura + x)})
+
+    def alcancavel(self, inicial: Posicao, objetivo: Posicao) -> bool:
+        if inicial == objetivo:
+            return True
+        rotulo = self.rotulo(objetivo)
+        return rotulo != -1 and rotulo in self._rotulos_de_saida(inicial)
+
+    def objetivo_mais_proximo(self, inicial: Posicao, objetivo: Posicao) -> Optional[Posicao]:
+        """
+        `objetivo` se for alcançável a partir de `inicial`; senão a célula
+        alcançável mais próxima dele pela heurística da grade (None se não
+        houver nenhuma). A procura cresce em anéis quadrados ao redor do
+        objetivo e para quando o anel fica mais longe que o melhor candidato.
+        """
+        if self.alcancavel(inicial, objetivo):
+            return objetivo
+        rotulos_de_saida = set(self._rotulos_de_saida(inicial))
+        if not rotulos_de_saida:
+            return None
+
+        grade = self.grade
+        largura, altura, rotulos = grade.largura, grade.altura, self.rotulos
+        heuristica = grade.estimativa_de_custo_heuristico
+        xo, yo = objetivo
+        melhor, melhor_distancia = None, float("inf")
+        raio = 1
+        # a heurística (Manhattan ou octil) nunca é menor que o raio do anel
+        while raio <= melhor_distancia and raio <= max(largura, altura):
+            for y in range(max(yo - raio, 0), min(yo + raio, altura - 1) + 1):
+                passo = 1 if abs(y - yo) == raio else 2 * raio
+                for x in range(xo - raio, xo + raio + 1, passo):
+                    if 0 <= x < largura and rotulos[y * largura + x] in rotulos_de_saida:
+                        distancia = heuristica((x, y), objetivo)
+                        if distancia < melhor_distancia:
+                            melhor, melhor_distancia = (x, y), distancia
+            raio += 1
+        return melhor
+
+    ################################################################################
+    # manutenção
+
+    def atualizar_celula(self, x: int, y: int, bloqueado: bool) -> None:
+        """Altera uma célula da grade e ajusta os rótulos"""
+        grade = self.grade
+        i = y * grade.largura + x
+        if bool(grade.bloqueado[i]) == bool(bloqueado):
+            return
+        grade.bloqueado[i] = 1 if bloqueado else 0
+        if bloqueado:
+            self._bloquear(i)
+        else:
+            self._liberar(i)
+
+    def _liberar(self, i: int) -> None:
+        rotulos, tamanhos = self.rotulos, self.tamanhos
+        vizinhos = {rotulos[j] for j in self._vizinhos(i)}
+        # mantém o rótulo do maior componente e renomeia os demais
+        if vizinhos:
+            maior = max(vizinhos, key=tamanhos.__getitem__)
+        else:
+            maior = self._novo_rotulo()
+            tamanhos[maior] = 0
+        rotulos[i] = maior
+        tamanhos[maior] += 1
+        for j in self._vizinhos(i):
+            rotulo = rotulos[j]
+            if rotulo != maior:
+                del tamanhos[rotulo]
+                tamanhos[maior] += self._rotular(j, maior)
+
+    def _bloquear(self, i: int) -> None:
+        rotulos, tamanhos = self.rotulos, self.tamanhos
+        rotulo = rotulos[i]
+        rotulos[i] = -1
+        tamanhos[rotulo] -= 1
+        if not tamanhos[rotulo]:
+            del tamanhos[rotulo]
+            return
+
+        # vizinhos que ainda se alcançam pela volta da célula não podem ter se separado
+        grupos: List[List[int]] = []
+        restantes = {j for j in self._vizinhos(i) if rotulos[j] == rotulo}
+        while restantes:
+            semente = restantes.pop()
+            grupo, pendentes = [semente], [semente]
+            while pendentes:
+                a = pendentes.pop()
+                for b in self._vizinhos(a):
+                    if b in restantes:
+                        restantes.discard(b)
+                        grupo.append(b)
+                        pendentes.append(b)
+            grupos.append(grupo)
+        if len(grupos) <= 1:
+            return
+
+        # buscas intercaladas, uma por grupo: as que se encontram se unem, e cada
+        # busca esgotada antes das demais é um novo componente
+        dono: Dict[int, int] = {}
+        pai = list(range(len(grupos)))
+
+        def raiz(g: int) -> int:
+            while pai[g] != g:
+                pai[g] = pai[pai[g]]
+                g = pai[g]
+            return g
+
+        filas = []
+        visitados: List[List[int]] = []
+        for g, grupo in enumerate(grupos):
+            for j in grupo:
+                dono[j] = g
+            filas.append(deque(grupo))
+            visitados.append(list(grupo))
+
+        ativos = set(range(len(grupos)))
+        while len({raiz(g) for g in ativos}) > 1:
+            for g in list(ativos):
+                fila = filas[g]
+                if not fila:
+                    ativos.discard(g)
+                    r = raiz(g)
+                    # só é um componente separado se nenhuma busca unida a ele continua ativa
+                    if not any(raiz(h) == r for h in ativos):
+                        novo = self._novo_rotulo()
+                        membros = [j for h in range(len(grupos)) if raiz(h) == r for j in visitados[h]]
+                        for j in membros:
+                            rotulos[j] = novo
+                        tamanhos[novo] = len(membros)
+                        tamanhos[rotulo] -= len(membros)
+                    continue
+                a = fila.popleft()
+                for b in self._vizinhos(a):
+                    h = dono.get(b)
+                    if h is None:
+                        dono[b] = g
+                        fila.append(b)
+                        visitados[g].append(b)
+                    elif raiz(h) != raiz(g):
+                        pai[raiz(h)] = raiz(g)
+
+
+__all__ = ["Conectividade"]
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+""" Busca cooperativa de caminhos para vários agentes (WHCA*: A* espaço-tempo com janela) """
+
+from math import inf as infinito
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from src.Astar import AStar, ArenaDeBusca
+from src.AstarGrade import AStarGrade, Posicao
+from src.CampoDeFluxo import CampoDeFluxo
+
+# um nó da busca espaço-tempo: (x, y, t)
+NoEspacoTempo = Tuple[int, int, int]
+
+
+################################################################################
+class TabelaDeReservas:
+    """
+    Células reservadas por agente e instante, compartilhada por todos os agentes
+    de um planejamento. Cada reserva é uma entrada de dicionário cuja chave é o
+    inteiro t * (largura * altura) + y * largura + x, sem tuplas.
+
+    Além da célula de destino, um movimento de i para j entre t e t + 1 não
+    pode trocar de lugar com o agente que estava em j em t e estará em i em
+    t + 1 (colisão frontal).
+    """
+
+    def __init__(self, largura: int, altura: int) -> None:
+        self.largura = largura
+        self.celulas = largura * altura
+        self.reservas: Dict[int, Hashable] = {}
+        # chaves reservadas por cada agente, para desfazer o plano de um agente de uma vez
+        self.do_agente: Dict[Hashable, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.reservas)
+
+    def reservar(self, i: int, t: int, agente: Hashable) -> None:
+        chave = t * self.celulas + i
+        self.reservas[chave] = agente
+        self.do_agente.setdefault(agente, []).append(chave)
+
+    def dono(self, i: int, t: int) -> Optional[Hashable]:
+        return self.reservas.get(t * self.celulas + i)
+
+    def livre(self, i: int, t: int, agente: Hashable) -> bool:
+        dono = self.reservas.get(t * self.celulas + i, agente)
+        return dono == agente
+
+    def movimento_livre(self, i: int, j: int, t: int, agente: Hashable) -> bool:
+        """o agente pode ir da célula i em t para a célula j em t + 1"""
+        reservas, n = self.reservas, self.celulas
+        dono = reservas.get((t + 1) * n + j, agente)
+        if dono != agente:
+            return False
+        if i == j:
+            return True
+        # quem está em j agora não pode estar em i no próximo instante
+        ocupante = reservas.get(t * n + j)
+        return ocupante is None or ocupante == agente or reservas.get((t + 1) * n + i) != ocupante
+
+    def liberar_agente(self, agente: Hashable) -> None:
+        """desfaz todas as reservas do agente"""
+        reservas = self.reservas
+        for chave in self.do_agente.pop(agente, ()):
+            if reservas.get(chave) == agente:
+                del reservas[chave]
+
+    def limpar(self) -> None:
+        self.reservas.clear()
+        self.do_agente.clear()
+
+
+################################################################################
+class AStarEspacoTempo(AStar[NoEspacoTempo]):
+    """
+    A* de um agente sobre nós (x, y, t), evitando as reservas dos demais.
+
+    A cada passo o agente anda um movimento da grade ou espera na mesma célula
+    (custo `custo_espera`). A busca termina ao chegar ao objetivo com a célula
+    livre até o fim da janela, ou ao chegar ao fim da janela (t = `horizonte`),
+    de onde a heurística, a distância real até o objetivo ignorando os outros
+    agentes (`campo`), estima o restante.
+    """
+
+    def __init__(
+        self,
+        grade: AStarGrade,
+        reservas: TabelaDeReservas,
+        agente: Hashable,
+        campo: CampoDeFluxo,
+        horizonte: int,
+        custo_espera: float = 1.0,
+    ) -> None:
+        self.grade = grade
+        self.reservas = reservas
+        self.agente = agente
+        self.campo = campo
+        self.horizonte = horizonte
+        self.custo_espera = custo_espera
+
+    def estimativa_de_custo_heuristico(self, atual: NoEspacoTempo, objetivo: NoEspacoTempo) -> float:
+        return self.campo.custo((atual[0], atual[1]))
+
+    def distancia_entre(self, n1: NoEspacoTempo, n2: NoEspacoTempo) -> float:
+        if n1[0] == n2[0] and n1[1] == n2[1]:
+            # parado no objetivo não há custo
+            return 0.0 if (n1[0], n1[1]) == self.campo.objetivo else self.custo_espera
+        return self.grade.distancia_entre(n1, n2)
+
+    def vizinhos(self, nó: NoEspacoTempo) -> Iterable[NoEspacoTempo]:
+        x, y, t = nó
+        if t >= self.horizonte:
+            return []
+        largura = self.grade.largura
+        i = y * largura + x
+        movimento_livre, agente = self.reservas.movimento_livre, self.agente
+        resultado = []
+        for nx, ny in [(x, y)] + list(self.grade.vizinhos((x, y))):
+            if movimento_livre(i, ny * largura + nx, t, agente):
+                resultado.append((nx, ny, t + 1))
+        return resultado
+
+    def objetivo_alcançado(self, atual: NoEspacoTempo, objetivo: NoEspacoTempo) -> bool:
+        x, y, t = atual
+        if t >= self.horizonte:
+            return True
+        if (x, y) != (objetivo[0], objetivo[1]):
+            return False
+        # só para no objetivo se ninguém passar por ele até o fim da janela
+        i = y * self.grade.largura + x
+        livre, agente = self.reservas.livre, self.agente
+        return all(livre(i, s, agente) for s in range(t + 1, self.horizonte + 1))
+
+
+################################################################################
+class PlanejadorCooperativo:
+    """
+    Planejamento de um time inteiro por A* cooperativo com janela (WHCA*).
+
+    A cada `planejar` os agentes são planejados em ordem de prioridade, cada um
+    por um `AStarEspacoTempo` que respeita as reservas dos anteriores e depois
+    reserva o próprio caminho até o fim da janela de `janela` passos. Como só a
+    janela é planejada com reservas, o custo por instante não depende do
+    tamanho do mapa, e o restante do trajeto vem da heurística de distância
+    real: um `CampoDeFluxo` por objetivo, guardado entre os planejamentos
+    (apenas `maximo_campos` objetivos, descartando o mais antigo).
+
+    Os agentes seguem os primeiros passos do plano e o time é replanejado
+    periodicamente (a cada instante, ou a cada metade da janela).
+    """
+
+    def __init__(self, grade: AStarGrade, janela: int = 16, custo_espera: float = 1.0, maximo_campos: int = 64) -> None:
+        self.grade = grade
+        self.janela = janela
+        self.custo_espera = custo_espera
+        self.maximo_campos = maximo_campos
+        self.reservas = TabelaDeReservas(grade.largura, grade.altura)
+        self.campos: Dict[Posicao, CampoDeFluxo] = {}
+        self.arena: ArenaDeBusca[NoEspacoTempo] = ArenaDeBusca(capacidade=1 << 16)
+        # último plano de cada agente, com os instantes
+        self.planos: Dict[Hashable, List[NoEspacoTempo]] = {}
+
+    def campo(self, objetivo: Posicao) -> CampoDeFluxo:
+        """distâncias reais até `objetivo`, calculadas uma vez por objetivo"""
+        campo = self.campos.pop(objetivo, None)
+        if campo is None:
+            campo = CampoDeFluxo(self.grade, objetivo)
+            while len(self.campos) >= self.maximo_campos:
+                del self.campos[next(iter(self.campos))]
+        # reinserido no fim: o primeiro do dicionário é o usado há mais tempo
+        self.campos[objetivo] = campo
+        return campo
+
+    def atualizar_celula(self, x: int, y: int, bloqueado: bool) -> None:
+        """altera uma célula da grade e repara os campos guardados"""
+        self.grade.atualizar_celula(x, y, bloqueado)
+        for campo in self.campos.values():
+            campo.atualizar_celula(x, y, bloqueado)
+
+    def _reservar(self, agente: Hashable, caminho: List[NoEspacoTempo], horizonte: int) -> None:
+        largura = self.grade.largura
+        for x, y, t in caminho:
+            self.reservas.reservar(y * largura + x, t, agente)
+        # o agente fica na última célula do plano até o fim da janela
+        x, y, t = caminho[-1]
+        for s in range(t + 1, horizonte + 1):
+            self.reservas.reservar(y * largura + x, s, agente)
+
+    def planejar(
+        self, agentes: Iterable[Tuple[Hashable, Posicao, Posicao]], t: int = 0
+    ) -> Dict[Hashable, List[Posicao]]:
+        """
+        Planeja os `agentes`, tuplas (agente, posição, objetivo) em ordem de
+        prioridade, a partir do instante `t`. Devolve, para cada agente, as
+        posições nos instantes t, t + 1, ... até chegar ao objetivo ou ao fim da
+        janela; um agente sem caminho fica parado na posição atual.
+
+        As reservas do planejamento anterior continuam valendo para cada agente
+        que seguiu o próprio plano até ele ser replanejado: assim o próximo passo
+        de um agente ainda não replanejado está sempre livre, e um agente que
+        prometeu sair de uma célula não a bloqueia para quem vem antes dele.
+        """
+        reservas, largura = self.reservas, self.grade.largura
+        horizonte = t + self.janela
+        # quem já está no objetivo é planejado por último, para poder dar passagem
+        agentes = sorted(agentes, key=lambda a: a[1] == a[2])
+        presentes = {agente for agente, _, _ in agentes}
+        for agente in [a for a in self.planos if a not in presentes]:
+            reservas.liberar_agente(agente)
+            del self.planos[agente]
+        for agente, (x, y), objetivo in agentes:
+            if (x, y) == objetivo:
+                # parado no objetivo não promete ficar: só ocupa a célula atual
+                reservas.liberar_agente(agente)
+                reservas.reservar(y * largura + x, t, agente)
+            elif self._posicao_no_plano(agente, t) != (x, y):
+                # sem plano válido: ocupa a célula atual até ser planejado
+                reservas.liberar_agente(agente)
+                reservas.reservar(y * largura + x, t, agente)
+                reservas.reservar(y * largura + x, t + 1, agente)
+
+        planos: Dict[Hashable, List[Posicao]] = {}
+        pendentes = deque(agentes)
+        por_agente = {a[0]: a for a in agentes}
+        while pendentes:
+            agente, posicao, objetivo = pendentes.popleft()
+            reservas.liberar_agente(agente)
+            inicial = (posicao[0], posicao[1], t)
+            caminho = None
+            campo = self.campo(objetivo) if self.grade.livre(*objetivo) else None
+            if campo is not None and campo.custo(posicao) < infinito:
+                busca = AStarEspacoTempo(self.grade, reservas, agente, campo, horizonte, self.custo_espera)
+                caminho = busca.astar(inicial, (objetivo[0], objetivo[1], horizonte), arena=self.arena)
+            if caminho is None:
+                # sem caminho o agente fica parado, e quem contava com a célula dele
+                # é replanejado (ficar parado nunca colide, então isto termina)
+                i = posicao[1] * largura + posicao[0]
+                for s in range(t + 1, horizonte + 1):
+                    dono = reservas.dono(i, s)
+                    if dono is not None and dono != agente:
+                        reservas.liberar_agente(dono)
+                        xd, yd = por_agente[dono][1]
+                        reservas.reservar(yd * largura + xd, t, dono)
+                        if por_agente[dono] in pendentes:
+                            pendentes.remove(por_agente[dono])
+                        pendentes.appendleft(por_agente[dono])
+                caminho = [inicial]
+            caminho = list(caminho)
+            self._reservar(agente, caminho, horizonte)
+            self.planos[agente] = caminho
+            planos[agente] = [(x, y) for x, y, _ in caminho]
+        return planos
+
+    def _posicao_no_plano(self, agente: Hashable, t: int) -> Optional[Posicao]:
+        plano = self.planos.get(agente)
+        if not plano or t < plano[0][2]:
+            return None
+        # depois do fim do plano o agente continua na última célula
+        x, y, _ = plano[min(t - plano[0][2], len(plano) - 1)]
+        return x, y
+
+
+__all__ = ["AStarEspacoTempo", "PlanejadorCooperativo", "TabelaDeReservas"]
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+""" Busca hierárquica de caminhos (HPA*) sobre uma grade """
+
+import pickle
+import zlib
+from heapq import heappush, heappop
+from math import inf as infinito
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from src.Astar import AStar, ArenaDeBusca, ListaAbertaBase
+from src.AstarGrade import AStarGrade, Posicao
+
+# (cx, cy, o): borda entre o cluster (cx, cy) e o vizinho à direita (o = 0) ou abaixo (o = 1);
+# o = 2 e o = 3 são os cantos (cx, cy)-(cx+1, cy+1) e (cx+1, cy)-(cx, cy+1)
+ChaveBorda = Tuple[int, int, int]
+Cluster = Tuple[int, int]
+
+# trechos livres de borda a partir deste tamanho recebem duas entradas (uma em cada ponta)
+TAMANHO_ENTRADA_DUPLA = 6
+
+
+################################################################################
+class AStarHierarquico(AStar[int]):
+    """
+    HPA*: a grade de um `AStarGrade` é dividida em clusters quadrados de
+    `tamanho_cluster` células. As entradas entre clusters vizinhos e as
+    distâncias entre as entradas de um mesmo cluster são pré-calculadas uma vez,
+    formando um grafo abstrato bem menor que a grade.
+
+    Cada consulta liga temporariamente a origem e o objetivo às entradas de seus
+    clusters, faz um A* no grafo abstrato (os nós são ids y * largura + x) e
+    devolve um gerador que refina cada trecho abstrato em células somente quando
+    o consumidor chega a ele. Origem e objetivo em clusters iguais ou vizinhos
+    também são ligados diretamente, e o caminho refinado é suavizado por janelas
+    (veja `_suavizar`): o caminho é quase ótimo, não necessariamente ótimo.
+
+    A abstração pode ser salva com `salvar` e recarregada com `carregar`, e
+    `atualizar_celula` refaz apenas o cluster alterado e seus vizinhos.
+    """
+
+    def __init__(self, grade: AStarGrade, tamanho_cluster: int = 16, preprocessar: bool = True) -> None:
+        self.grade = grade
+        self.tamanho_cluster = tamanho_cluster
+        self.clusters_x = -(-grade.largura // tamanho_cluster)
+        self.clusters_y = -(-grade.altura // tamanho_cluster)
+        # pares (a, b) de células que cruzam cada borda
+        self.bordas: Dict[ChaveBorda, List[Tuple[int, int]]] = {}
+        # entradas de cada cluster
+        self.nos_cluster: Dict[Cluster, Set[int]] = {}
+        # arestas do grafo abstrato entre clusters e dentro de cada cluster
+        self.inter: Dict[int, Dict[int, float]] = {}
+        self.intra: Dict[int, Dict[int, float]] = {}
+        # arestas da origem e do objetivo da consulta em andamento
+        self.temporarios: Dict[int, Dict[int, float]] = {}
+        if preprocessar:
+            self.preprocessar()
+
+    ############################################################################
+    # grafo abstrato
+
+    def estimativa_de_custo_heuristico(self, atual: int, objetivo: int) -> float:
+        largura = self.grade.largura
+        return self.grade.estimativa_de_custo_heuristico(divmod(atual, largura)[::-1], divmod(objetivo, largura)[::-1])
+
+    def distancia_entre(self, n1: int, n2: int) -> float:
+        return min(
+            self.intra.get(n1, {}).get(n2, infinito),
+            self.inter.get(n1, {}).get(n2, infinito),
+            self.temporarios.get(n1, {}).get(n2, infinito),
+        )
+
+    def vizinhos(self, nó: int) -> List[int]:
+        resultado = []
+        for arestas in (self.intra, self.inter, self.temporarios):
+            if nó in arestas:
+                resultado.extend(arestas[nó])
+        return resultado
+
+    ############################################################################
+    # pré-processamento
+
+    def cluster(self, nó: int) -> Cluster:
+        y, x = divmod(nó, self.grade.largura)
+        return x // self.tamanho_cluster, y // self.tamanho_cluster
+
+    def limites(self, cluster: Cluster) -> Tuple[int, int, int, int]:
+        """(x0, y0, x1, y1) do cluster, com x1 e y1 exclusivos"""
+        t = self.tamanho_cluster
+        cx, cy = cluster
+        return cx * t, cy * t, min((cx + 1) * t, self.grade.largura), min((cy + 1) * t, self.grade.altura)
+
+    def _bordas_do_cluster(self, cluster: Cluster) -> List[ChaveBorda]:
+        cx, cy = cluster
+        chaves = [
+            (cx, cy, 0), (cx, cy, 1), (cx - 1, cy, 0), (cx, cy - 1, 1),
+            (cx, cy, 2), (cx - 1, cy - 1, 2), (cx - 1, cy, 3), (cx, cy - 1, 3),
+        ]
+        return [
+            (x, y, o) for x, y, o in chaves
+            if 0 <= x < self.clusters_x - (o != 1) and 0 <= y < self.clusters_y - (o != 0)
+        ]
+
+    def preprocessar(self) -> None:
+        for cy in range(self.clusters_y):
+            for cx in range(self.clusters_x):
+                for chave in self._bordas_do_cluster((cx, cy)):
+                    if chave not in self.bordas:
+                        self._construir_borda(chave)
+        for cy in range(self.clusters_y):
+            for cx in range(self.clusters_x):
+                self._construir_cluster((cx, cy))
+
+    def _construir_borda(self, chave: ChaveBorda) -> None:
+        for a, b in self.bordas.pop(chave, ()):
+            for u, v in ((a, b), (b, a)):
+                del self.inter[u][v]
+                if not self.inter[u]:
+                    del self.inter[u]
+
+        cx, cy, o = chave
+        grade = self.grade
+        largura, bloqueado = grade.largura, grade.bloqueado
+        x0, y0, x1, y1 = self.limites((cx, cy))
+        # com corte de cantos, um passo diagonal entre dois obstáculos pode ser a
+        # única passagem entre clusters; esses passos viram entradas próprias
+        diagonais_isoladas = grade.diagonais and grade.cortar_cantos
+
+        def livre(x, y):
+            return not bloqueado[y * largura + x]
+
+        pares = []
+        if o >= 2:
+            # canto: (xa, ya) -> (xb, yb) é um passo diagonal entre dois clusters
+            xa, xb = (x1 - 1, x1) if o == 2 else (x1, x1 - 1)
+            if diagonais_isoladas and livre(xa, y1 - 1) and livre(xb, y1) and not livre(xb, y1 - 1) and not livre(xa, y1):
+                pares.append(((y1 - 1) * largura + xa, y1 * largura + xb))
+        else:
+            if o == 0:
+                # coluna x1 - 1 do cluster e coluna x1 do vizinho à direita
+                celulas = [((x1 - 1, y), (x1, y)) for y in range(y0, y1)]
+            else:
+                celulas = [((x, y1 - 1), (x, y1)) for x in range(x0, x1)]
+
+            trecho: List[Tuple[int, int]] = []
+            for (xa, ya), (xb, yb) in celulas + [((-1, -1), (-1, -1))]:
+                if xa != -1 and livre(xa, ya) and livre(xb, yb):
+                    trecho.append((ya * largura + xa, yb * largura + xb))
+                    continue
+                if trecho:
+                    if len(trecho) >= TAMANHO_ENTRADA_DUPLA:
+                        pares += [trecho[0], trecho[-1]]
+                    else:
+                        pares.append(trecho[len(trecho) // 2])
+                    trecho = []
+
+            if diagonais_isoladas:
+                # passos diagonais ao longo da borda cujos dois passos retos estão bloqueados
+                for ((xa, ya), (xb, yb)), ((xc, yc), (xd, yd)) in zip(celulas, celulas[1:]):
+                    if not livre(xb, yb) and not livre(xc, yc) and livre(xa, ya) and livre(xd, yd):
+                        pares.append((ya * largura + xa, yd * largura + xd))
+                    if not livre(xa, ya) and not livre(xd, yd) and livre(xc, yc) and livre(xb, yb):
+                        pares.append((yc * largura + xc, yb * largura + xb))
+
+        self.bordas[chave] = pares
+        for a, b in pares:
+            custo = grade.distancia_entre(divmod(a, largura)[::-1], divmod(b, largura)[::-1])
+            self.inter.setdefault(a, {})[b] = custo
+            self.inter.setdefault(b, {})[a] = custo
+
+    def _construir_cluster(self, cluster: Cluster) -> None:
+        for nó in self.nos_cluster.pop(cluster, ()):
+            self.intra.pop(nó, None)
+
+        nos = set()
+        for chave in self._bordas_do_cluster(cluster):
+            for par in self.bordas.get(chave, ()):
+                nos.update(nó for nó in par if self.cluster(nó) == cluster)
+        self.nos_cluster[cluster] = nos
+
+        limites = self.limites(cluster)
+        for nó in nos:
+            distancias, _ = self._busca_local(nó, limites)
+            self.intra[nó] = {m: distancias[m] for m in nos if m != nó and m in distancias}
+
+    def _busca_local(
+        self, origem: int, limites: Tuple[int, int, int, int], alvo: int = -1
+    ) -> Tuple[Dict[int, float], Dict[int, int]]:
+        """Dijkstra restrito a um cluster (A* quando há `alvo`); devolve distâncias e pais"""
+        grade = self.grade
+        largura, bloqueado, cortar_cantos = grade.largura, grade.bloqueado, grade.cortar_cantos
+        x0, y0, x1, y1 = limites
+        if alvo != -1:
+            ya, xa = divmod(alvo, largura)
+            heuristica = lambda x, y: grade.estimativa_de_custo_heuristico((x, y), (xa, ya))
+        else:
+            heuristica = lambda x, y: 0.0
+
+        distancias = {origem: 0.0}
+        pais = {origem: -1}
+        fechados = set()
+        lista_aberta = [(0.0, origem)]
+        while lista_aberta:
+            _, atual = heappop(lista_aberta)
+            if atual in fechados:
+                continue
+            if atual == alvo:
+                break
+            fechados.add(atual)
+            g = distancias[atual]
+            y, x = divmod(atual, largura)
+            for dx, dy, custo in grade.movimentos:
+                nx, ny = x + dx, y + dy
+                if not (x0 <= nx < x1 and y0 <= ny < y1):
+                    continue
+                vizinho = ny * largura + nx
+                if bloqueado[vizinho] or vizinho in fechados:
+                    continue
+                if dx and dy and not cortar_cantos and (bloqueado[atual + dx] or bloqueado[atual + dy * largura]):
+                    continue
+                novo = g + custo
+                if novo < distancias.get(vizinho, infinito):
+                    distancias[vizinho] = novo
+                    pais[vizinho] = atual
+                    heappush(lista_aberta, (novo + heuristica(nx, ny), vizinho))
+        return distancias, pais
+
+    ############################################################################
+    # consultas
+
+    def astar(
+        self,
+        inicial: Posicao,
+        objetivo: Posicao,
+        caminho_invertido: bool = False,
+        tipo_lista_aberta: Optional[Callable[[], ListaAbertaBase]] = None,
+        bidirecional: bool = False,
+        arena: Optional[ArenaDeBusca[int]] = None,
+    ) -> Union[Iterator[Posicao], None]:
+        """
+        Devolve um gerador das células do caminho (ou None se o objetivo for
+        inalcançável); cada trecho é refinado apenas quando é consumido.
+
+        `tipo_lista_aberta` e `arena` são usados na busca no grafo abstrato. A
+        busca bidirecional não é suportada: as arestas temporárias da origem e
+        do objetivo só existem em um sentido.
+        """
+        if bidirecional:
+            raise ValueError("a busca bidirecional não é suportada pelo AStarHierarquico")
+        grade = self.grade
+        if inicial == objetivo:
+            return iter([inicial])
+        if not grade.livre(*objetivo) or not (0 <= inicial[0] < grade.largura and 0 <= inicial[1] < grade.altura):
+            return None
+
+        largura = grade.largura
+        origem = inicial[1] * largura + inicial[0]
+        alvo = objetivo[1] * largura + objetivo[0]
+        cluster_origem, cluster_alvo = self.cluster(origem), self.cluster(alvo)
+
+        temporarios = self.temporarios
+        distancias, _ = self._busca_local(origem, self.limites(cluster_origem))
+        for nó in self.nos_cluster[cluster_origem]:
+            if nó in distancias and nó != origem:
+                temporarios.setdefault(origem, {})[nó] = distancias[nó]
+        # em clusters iguais ou vizinhos o caminho direto, por uma busca na união
+        # dos dois clusters, evita o desvio até as entradas (uma célula de cada
+        # lado de uma borda, por exemplo, passaria pela entrada mais próxima)
+        direto = None
+        if abs(cluster_origem[0] - cluster_alvo[0]) <= 1 and abs(cluster_origem[1] - cluster_alvo[1]) <= 1:
+            (xa0, ya0, xa1, ya1), (xb0, yb0, xb1, yb1) = self.limites(cluster_origem), self.limites(cluster_alvo)
+            direto = min(xa0, xb0), min(ya0, yb0), max(xa1, xb1), max(ya1, yb1)
+            distancias, _ = self._busca_local(origem, direto, alvo)
+            if alvo in distancias:
+                temporarios.setdefault(origem, {})[alvo] = distancias[alvo]
+        distancias, _ = self._busca_local(alvo, self.limites(cluster_alvo))
+        for nó in self.nos_cluster[cluster_alvo]:
+            if nó in distancias and nó != alvo:
+                temporarios.setdefault(nó, {})[alvo] = distancias[nó]
+
+        try:
+            abstrato = super().astar(origem, alvo, tipo_lista_aberta=tipo_lista_aberta, arena=arena)
+        finally:
+            temporarios.clear()
+
+        if abstrato is None:
+            return None
+        caminho = self._suavizar(self._refinar(list(abstrato), direto))
+        if caminho_invertido:
+            # os trechos são refinados sempre no sentido da busca: a origem pode
+            # estar bloqueada e não ser alcançável a partir das entradas
+            return iter(list(caminho)[::-1])
+        return caminho
+
+    def _refinar(self, ids: List[int], direto: Union[Tuple[int, int, int, int], None] = None) -> Iterator[Posicao]:
+        largura = self.grade.largura
+        yield divmod(ids[0], largura)[::-1]
+        for a, b in zip(ids, ids[1:]):
+            cluster = self.cluster(a)
+            if direto is not None and len(ids) == 2:
+                # aresta temporária da origem direto ao objetivo
+                limites = direto
+            elif cluster != self.cluster(b):
+                # aresta entre clusters: as células são adjacentes
+                yield divmod(b, largura)[::-1]
+                continue
+            else:
+                limites = self.limites(cluster)
+            _, pais = self._busca_local(a, limites, b)
+            trecho = []
+            atual = b
+            while atual != a:
+                trecho.append(atual)
+                atual = pais[atual]
+            for nó in reversed(trecho):
+                yield divmod(nó, largura)[::-1]
+
+    def _suavizar(self, celulas: Iterator[Posicao]) -> Iterator[Posicao]:
+        """
+        Refaz o caminho refinado em janelas de 3 * `tamanho_cluster` células que
+        se sobrepõem pela metade: cada janela é trocada pelo caminho ótimo entre
+        suas pontas dentro do retângulo que a contém, o que desfaz os desvios até
+        as entradas dos clusters. Só é consumida a parte já suavizada.
+        """
+        grade = self.grade
+        largura = grade.largura
+        janela = max(3 * self.tamanho_cluster, 4)
+        trecho: List[Posicao] = []
+        fim = False
+        while not fim:
+            for celula in celulas:
+                trecho.append(celula)
+                if len(trecho) >= janela:
+                    break
+            else:
+                fim = True
+            if len(trecho) > 2:
+                xs = [x for x, _ in trecho]
+                ys = [y for _, y in trecho]
+                (xa, ya), (xb, yb) = trecho[0], trecho[-1]
+                a, b = ya * largura + xa, yb * largura + xb
+                distancias, pais = self._busca_local(a, (min(xs), min(ys), max(xs) + 1, max(ys) + 1), b)
+                custo = sum(grade.distancia_entre(p, q) for p, q in zip(trecho, trecho[1:]))
+                if distancias.get(b, infinito) < custo - 1e-9:
+                    novo = []
+                    atual = b
+                    while atual != -1:
+                        novo.append(divmod(atual, largura)[::-1])
+                        atual = pais[atual]
+                    trecho = novo[::-1]
+            if fim:
+                yield from trecho
+            else:
+                metade = len(trecho) // 2
+                yield from trecho[:metade]
+                trecho = trecho[metade:]
+
+    ############################################################################
+    # manutenção
+
+    def atualizar_celula(self, x: int, y: int, bloqueado: bool) -> None:
+        """Altera uma célula da grade e refaz apenas o seu cluster e os vizinhos"""
+        self.grade.atualizar_celula(x, y, bloqueado)
+        cx, cy = x // self.tamanho_cluster, y // self.tamanho_cluster
+        # os cantos dos clusters vizinhos também consultam as células deste cluster
+        vizinhanca = [(cx + dx, cy + dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+        vizinhanca = [c for c in vizinhanca if c in self.nos_cluster]
+        for chave in {chave for cluster in vizinhanca for chave in self._bordas_do_cluster(cluster)}:
+            self._construir_borda(chave)
+        for cluster in vizinhanca:
+            self._construir_cluster(cluster)
+
+    def _assinatura_grade(self) -> Tuple[int, int, int]:
+        grade = self.grade
+        return grade.largura, grade.altura, zlib.crc32(grade.bloqueado)
+
+    def salvar(self, arquivo: str) -> None:
+        with open(arquivo, "wb") as f:
+            pickle.dump(
+                {
+                    "grade": self._assinatura_grade(),
+                    "tamanho_cluster": self.tamanho_cluster,
+                    "bordas": self.bordas,
+                    "nos_cluster": self.nos_cluster,
+                    "inter": self.inter,
+                    "intra": self.intra,
+                },
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+
+    @classmethod
+    def carregar(cls, arquivo: str, grade: AStarGrade) -> "AStarHierarquico":
+        """Recarrega uma abstração salva; a grade deve ser idêntica à usada em `salvar`"""
+        with open(arquivo, "rb") as f:
+            dados = pickle.load(f)
+        hierarquico = cls(grade, dados["tamanho_cluster"], preprocessar=False)
+        if dados["grade"] != hierarquico._assinatura_grade():
+            raise ValueError("a abstração salva foi gerada para outra grade")
+        hierarquico.bordas = dados["bordas"]
+        hierarquico.nos_cluster = dados["nos_cluster"]
+        hierarquico.inter = dados["inter"]
+        hierarquico.intra = dados["intra"]
+        return hierarquico
+
+
+__all__ = ["AStarHierarquico"]
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+""" Formato binário de mapas de grade, carregado por mapeamento de memória """
+
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from typing import Optional, Sequence, Union
+
+# cabeçalho: mágica, versão, flags, reservado, largura, altura (16 bytes, little-endian)
+CABECALHO = struct.Struct("<4sBBHII")
+MAGICA = b"GRDM"
+VERSAO = 1
+# flags
+COM_CUSTOS = 0x01
+
+
+def _alinhar(n: int, alinhamento: int = 4) -> int:
+    return (n + alinhamento - 1) // alinhamento * alinhamento
+
+
+################################################################################
+class Mapa:
+    """
+    Grade de ocupação com uma camada opcional de custo por célula.
+
+    No arquivo, o cabeçalho é seguido pela ocupação (um uint8 por célula, 1 =
+    bloqueada, indexada por y * largura + x) e, se a flag COM_CUSTOS estiver
+    ligada, pela camada de custos (um float32 little-endian por célula, começando
+    no próximo múltiplo de 4 bytes).
+
+    `abrir` mapeia o arquivo em memória em vez de lê-lo: as camadas são
+    `memoryview`s sobre o mapeamento, então vários processos que abrem o mesmo
+    mapa compartilham uma única cópia no cache de páginas do sistema. O
+    mapeamento é copy-on-write (`ACCESS_COPY`), de modo que alterar células
+    (`Conectividade.atualizar_celula`, ...) não altera o arquivo.
+
+    `ocupacao` tem a mesma interface de índice do `bloqueado` do `AStarGrade`,
+    que a usa diretamente quando recebe um `Mapa`.
+    """
+
+    def __init__(
+        self,
+        largura: int,
+        altura: int,
+        ocupacao: Union[bytearray, memoryview, None] = None,
+        custos: Union[array, memoryview, None] = None,
+    ) -> None:
+        n = largura * altura
+        self.largura = largura
+        self.altura = altura
+        self.ocupacao = bytearray(n) if ocupacao is None else ocupacao
+        self.custos = custos
+        if len(self.ocupacao) != n or (custos is not None and len(custos) != n):
+            raise ValueError("as camadas do mapa devem ter largura * altura células")
+        # arquivo mapeado e crc da ocupação ao abrir, para serializar o mapa pelo caminho
+        self.arquivo: Optional[str] = None
+        self._crc_ao_abrir: Optional[int] = None
+
+    @classmethod
+    def de_grade(cls, grade: Sequence[Sequence], custos: Optional[Sequence[Sequence[float]]] = None) -> "Mapa":
+        """`grade[y][x]` verdadeiro indica uma célula bloqueada; `custos[y][x]`, o custo da célula"""
+        altura = len(grade)
+        largura = len(grade[0]) if altura else 0
+        ocupacao = bytearray(largura * altura)
+        for y, linha in enumerate(grade):
+            if len(linha) != largura:
+                raise ValueError("todas as linhas da grade devem ter a mesma largura")
+            ocupacao[y * largura:(y + 1) * largura] = bytes(1 if c else 0 for c in linha)
+        camada = None
+        if custos is not None:
+            camada = array("f", (c for linha in custos for c in linha))
+        return cls(largura, altura, ocupacao, camada)
+
+    @classmethod
+    def de_linhas(cls, linhas: Union[str, Sequence[str]], livre: str = " ") -> "Mapa":
+        """Converte um mapa ASCII (como os de `criar_labirinto` ou o `campo_futebol`),
+        onde apenas o caractere `livre` é transitável"""
+        if isinstance(linhas, str):
+            linhas = linhas.strip().split("\n")
+        return cls.de_grade([[c != livre for c in linha] for linha in linhas])
+
+    @classmethod
+    def de_imagem(cls, arquivo: str, tamanho_celula: int = 1, limiar: int = 128) -> "Mapa":
+        """
+        Converte uma imagem (PNG ou outro formato lido pelo pygame): cada bloco de
+        `tamanho_celula` x `tamanho_celula` pixels vira uma célula, bloqueada se a
+        luminância média do bloco for menor que `limiar` (pixels escuros são
+        obstáculos). Requer o pygame, importado apenas aqui.
+        """
+        import pygame  # type: ignore
+
+        imagem = pygame.image.load(arquivo)
+        largura_px, altura_px = imagem.get_size()
+        pixels = pygame.image.tostring(imagem, "RGB")
+        largura, altura = largura_px // tamanho_celula, altura_px // tamanho_celula
+        area = tamanho_celula * tamanho_celula
+
+        ocupacao = bytearray(largura * altura)
+        for y in range(altura):
+            for x in range(largura):
+                soma = 0
+                for py in range(y * tamanho_celula, (y + 1) * tamanho_celula):
+                    inicio = (py * largura_px + x * tamanho_celula) * 3
+                    bloco = pixels[inicio:inicio + tamanho_celula * 3]
+                    # luminância inteira (ITU-R BT.601)
+                    soma += 299 * sum(bloco[0::3]) + 587 * sum(bloco[1::3]) + 114 * sum(bloco[2::3])
+                if soma < limiar * 1000 * area:
+                    ocupacao[y * largura + x] = 1
+        return cls(largura, altura, ocupacao)
+
+    def livre(self, x: int, y: int) -> bool:
+        return 0 <= x < self.largura and 0 <= y < self.altura and not self.ocupacao[y * self.largura + x]
+
+    def custo(self, x: int, y: int) -> float:
+        """custo da célula (1.0 sem camada de custos)"""
+        return 1.0 if self.custos is None else self.custos[y * self.largura + x]
+
+    ################################################################################
+    # arquivo
+
+    def salvar(self, arquivo: str) -> None:
+        flags = COM_CUSTOS if self.custos is not None else 0
+        n = self.largura * self.altura
+        with open(arquivo, "wb") as f:
+            f.write(CABECALHO.pack(MAGICA, VERSAO, flags, 0, self.largura, self.altura))
+            f.write(self.ocupacao)
+            if self.custos is not None:
+                f.write(bytes(_alinhar(CABECALHO.size + n) - CABECALHO.size - n))
+                custos = array("f", self.custos)
+                if sys.byteorder != "little":
+                    custos.byteswap()
+                f.write(custos.tobytes())
+
+    @classmethod
+    def abrir(cls, arquivo: str) -> "Mapa":
+        with open(arquivo, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        if len(buffer) < CABECALHO.size:
+            raise ValueError("%s não é um mapa: arquivo curto demais" % arquivo)
+        magica, versao, flags, _, largura, altura = CABECALHO.unpack_from(buffer)
+        if magica != MAGICA:
+            raise ValueError("%s não é um mapa" % arquivo)
+        if versao != VERSAO:
+            raise ValueError("versão de mapa não suportada: %d" % versao)
+
+        n = largura * altura
+        inicio_custos = _alinhar(CABECALHO.size + n)
+        tamanho = inicio_custos + 4 * n if flags & COM_CUSTOS else CABECALHO.size + n
+        if len(buffer) < tamanho:
+            raise ValueError("%s está truncado" % arquivo)
+
+        visao = memoryview(buffer)
+        ocupacao = visao[CABECALHO.size:CABECALHO.size + n]
+        custos = None
+        if flags & COM_CUSTOS:
+            if sys.byteorder == "little":
+                custos = visao[inicio_custos:inicio_custos + 4 * n].cast("f")
+            else:
+                custos = array("f", visao[inicio_custos:inicio_custos + 4 * n].tobytes())
+                custos.byteswap()
+
+        mapa = cls(largura, altura, ocupacao, custos)
+        mapa.arquivo = arquivo
+        mapa._crc_ao_abrir = zlib.crc32(ocupacao)
+        return mapa
+
+    def __reduce__(self):
+        # um mapa aberto e não alterado é reaberto pelo caminho em outro processo,
+        # compartilhando as páginas; os demais são copiados
+        if self.arquivo is not None and zlib.crc32(self.ocupacao) == self._crc_ao_abrir:
+            return Mapa.abrir, (self.arquivo,)
+        custos = None if self.custos is None else array("f", self.custos)
+        return Mapa, (self.largura, self.altura, bytearray(self.ocupacao), custos)
+
+
+################################################################################
+def main() -> None:
+    """converte um mapa ASCII (.txt) ou uma imagem para o formato binário"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("entrada", help="mapa ASCII ou imagem (PNG, ...)")
+    parser.add_argument("saida", help="arquivo de mapa binário")
+    parser.add_argument("--livre", default=" ", help="caractere transitável do mapa ASCII")
+    parser.add_argument("--tamanho-celula", type=int, default=1, help="pixels por célula da imagem")
+    parser.add_argument("--limiar", type=int, default=128, help="luminância abaixo da qual um pixel é obstáculo")
+    args = parser.parse_args()
+
+    if args.entrada.lower().endswith(".txt"):
+        with open(args.entrada) as f:
+            mapa = Mapa.de_linhas(f.read(), args.livre)
+    else:
+        mapa = Mapa.de_imagem(args.entrada, args.tamanho_celula, args.limiar)
+    mapa.salvar(args.saida)
+    print("%s: %d x %d" % (args.saida, mapa.largura, mapa.altura))
+
+
+__all__ = ["Mapa"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+""" Heurística de marcos (ALT: A*, landmarks e desigualdade triangular) """
+
+import pickle
+import zlib
+from array import array
+from collections import deque
+from heapq import heappush, heappop
+from math import inf as infinito
+from typing import Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from src.Astar import AStar
+
+T = TypeVar("T")
+
+
+################################################################################
+class Marcos(Generic[T]):
+    """
+    Tabelas de distâncias exatas a partir de `quantidade` nós-marco, usadas como
+    heurística: para um marco L, |d(L, objetivo) - d(L, nó)| nunca é maior que
+    d(nó, objetivo) (desigualdade triangular), e o máximo sobre os marcos é uma
+    heurística admissível e consistente, muito mais informada que a distância
+    em linha reta em labirintos.
+
+    O grafo é o de `solucionador.vizinhos`/`distancia_entre`, que deve ser não
+    direcionado, restrito aos nós alcançáveis a partir de `origens`. Os marcos
+    são escolhidos pelo ponto mais distante: cada novo marco é o nó mais longe
+    de todos os marcos já escolhidos. As distâncias ficam em um `array('d')`
+    por marco, indexado pela posição do nó em `nós`.
+
+    Nós fora das tabelas recebem heurística 0; nós de componentes diferentes,
+    heurística infinita.
+    """
+
+    def __init__(
+        self, solucionador: AStar[T], origens: Iterable[T], quantidade: int = 8, preprocessar: bool = True
+    ) -> None:
+        self.solucionador = solucionador
+        self.quantidade = quantidade
+        self.origens: List[T] = []
+        self.nós: List[T] = []
+        self.indice: Dict[T, int] = {}
+        self.marcos: List[int] = []
+        self.tabelas: List[array] = []
+        # identifica o grafo enumerado, para recusar tabelas de outro mapa em `carregar`
+        self.assinatura: Optional[Tuple[int, int]] = None
+        # distâncias do último objetivo consultado a cada marco
+        self._objetivo: Optional[T] = None
+        self._distancias_objetivo: List[float] = []
+        if preprocessar:
+            self.preprocessar(origens)
+
+    def __len__(self) -> int:
+        return len(self.nós)
+
+    def _enumerar(self, origens: Iterable[T]) -> Tuple[array, array, array]:
+        """indexa os nós alcançáveis e monta a lista de adjacência compacta (CSR)"""
+        vizinhos = self.solucionador.vizinhos
+        distancia = self.solucionador.distancia_entre
+        nós, indice = self.nós, self.indice
+        inicio, destinos, custos = array("l", [0]), array("l"), array("d")
+
+        pendentes = deque()
+        for origem in origens:
+            if origem not in indice:
+                indice[origem] = len(nós)
+                nós.append(origem)
+                pendentes.append(origem)
+            # os nós são numerados em ordem de descoberta, então a fila segue a ordem dos índices
+            while pendentes:
+                nó = pendentes.popleft()
+                for vizinho in vizinhos(nó):
+                    j = indice.get(vizinho)
+                    if j is None:
+                        j = indice[vizinho] = len(nós)
+                        nós.append(vizinho)
+                        pendentes.append(vizinho)
+                    destinos.append(j)
+                    custos.append(distancia(nó, vizinho))
+                inicio.append(len(destinos))
+        return inicio, destinos, custos
+
+    @staticmethod
+    def _dijkstra(origem: int, n: int, inicio: array, destinos: array, custos: array) -> array:
+        distancias = array("d", [infinito]) * n
+        distancias[origem] = 0.0
+        fila = [(0.0, origem)]
+        while fila:
+            d, i = heappop(fila)
+            if d > distancias[i]:
+                continue
+            for k in range(inicio[i], inicio[i + 1]):
+                nd = d + custos[k]
+                j = destinos[k]
+                if nd < distancias[j]:
+                    distancias[j] = nd
+                    heappush(fila, (nd, j))
+        return distancias
+
+    def preprocessar(self, origens: Iterable[T]) -> None:
+        self.nós.clear()
+        self.indice.clear()
+        self.marcos.clear()
+        self.tabelas.clear()
+        self._objetivo = None
+
+        self.origens = list(origens)
+        inicio, destinos, custos = self._enumerar(self.origens)
+        self.assinatura = self._assinatura(inicio, destinos, custos)
+        n = len(self.nós)
+        if not n:
+            return
+
+        # o primeiro marco é o nó mais distante do primeiro nó; os seguintes maximizam
+        # a menor distância aos marcos já escolhidos (componentes sem marco vêm antes)
+        menores = self._dijkstra(0, n, inicio, destinos, custos)
+        for _ in range(min(self.quantidade, n)):
+            marco = max(range(n), key=menores.__getitem__)
+            if marco in self.marcos:
+                break
+            tabela = self._dijkstra(marco, n, inicio, destinos, custos)
+            self.marcos.append(marco)
+            self.tabelas.append(tabela)
+            menores = array("d", map(min, menores, tabela)) if len(self.marcos) > 1 else tabela
+
+    def estimativa(self, atual: T, objetivo: T) -> float:
+        i = self.indice.get(atual)
+        j = self.indice.get(objetivo)
+        if i is None or j is None:
+            return 0.0
+        if objetivo != self._objetivo:
+            self._objetivo = objetivo
+            self._distancias_objetivo = [tabela[j] for tabela in self.tabelas]
+
+        melhor = 0.0
+        for tabela, distancia_objetivo in zip(self.tabelas, self._distancias_objetivo):
+            distancia_atual = tabela[i]
+            if distancia_atual == distancia_objetivo:
+                continue
+            # um dos dois fora do componente do marco: estão em componentes diferentes
+            if distancia_atual == infinito or distancia_objetivo == infinito:
+                return infinito
+            diferenca = abs(distancia_objetivo - distancia_atual)
+            if diferenca > melhor:
+                melhor = diferenca
+        return melhor
+
+    __call__ = estimativa
+
+    def _assinatura(self, inicio: array, destinos: array, custos: array) -> Tuple[int, int]:
+        crc = zlib.crc32(pickle.dumps(self.nós, protocol=pickle.HIGHEST_PROTOCOL))
+        for buffer in (inicio, destinos, custos):
+            crc = zlib.crc32(buffer.tobytes(), crc)
+        return len(self.nós), crc
+
+    def salvar(self, arquivo: str) -> None:
+        with open(arquivo, "wb") as f:
+            pickle.dump(
+                {
+                    "origens": self.origens,
+                    "assinatura": self.assinatura,
+                    "quantidade": self.quantidade,
+                    "marcos": self.marcos,
+                    "tabelas": [tabela.tobytes() for tabela in self.tabelas],
+                },
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+
+    @classmethod
+    def carregar(cls, arquivo: str, solucionador: AStar[T]) -> "Marcos[T]":
+        """
+        Recarrega tabelas salvas. O grafo é enumerado de novo (uma busca em
+        largura, bem mais barata que as buscas dos marcos) e deve ser idêntico
+        ao usado em `salvar`.
+        """
+        with open(arquivo, "rb") as f:
+            dados = pickle.load(f)
+        marcos = cls(solucionador, (), dados["quantidade"], preprocessar=False)
+        marcos.origens = dados["origens"]
+        marcos.assinatura = marcos._assinatura(*marcos._enumerar(marcos.origens))
+        if dados["assinatura"] != marcos.assinatura:
+            raise ValueError("as tabelas salvas foram geradas para outro mapa")
+        marcos.marcos = dados["marcos"]
+        for dados_tabela in dados["tabelas"]:
+            tabela = array("d")
+            tabela.frombytes(dados_tabela)
+            marcos.tabelas.append(tabela)
+        return marcos
+
+
+################################################################################
+class HeuristicaDeMarcos:
+    """
+    Mixin para subclasses de `AStar`: a heurística passa a ser o máximo entre a
+    heurística da classe e a dos `marcos` (o máximo de heurísticas admissíveis
+    também é admissível).
+
+        class SolucionadorComMarcos(HeuristicaDeMarcos, SolucionadorLabirinto):
+            pass
+
+        solucionador = SolucionadorComMarcos(labirinto)
+        solucionador.marcos = Marcos(solucionador, [inicio])
+    """
+
+    marcos: Optional[Marcos] = None
+
+    def estimativa_de_custo_heuristico(self, atual, objetivo) -> float:
+        h = super().estimativa_de_custo_heuristico(atual, objetivo)  # type: ignore
+        if self.marcos is None:
+            return h
+        return max(h, self.marcos.estimativa(atual, objetivo))
+
+
+__all__ = ["HeuristicaDeMarcos", "Marcos"]